@@ -0,0 +1,162 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from pipeline import run_pipeline, RESULT_FILE, RUN_REPORT_FILE
+from sap_processor import FLAT_FILE_EXTENSIONS
+from compare_processor import STAV_OK, STAV_MANKO, STAV_PREBYTEK
+from utils import write_excel_tables, column_widths
+from instrumentation import get_logger, start_run
+
+log = get_logger("batch")
+
+# --- KONFIGURACE ---
+BATCH_OUTPUT_DIR = "sklady_porovnani/batch"
+INDEX_FILE = "index.xlsx"
+LOG_FILE = "beh.log"
+
+def load_manifest(manifest_path):
+    """
+    Načte seznam dvojic ze souboru: JSON (seznam objektů) nebo CSV/TXT se sloupci name, sap, raben.
+    Relativní cesty se berou vůči složce manifestu.
+    """
+    if manifest_path.lower().endswith(".json"):
+        with open(manifest_path, encoding="utf-8") as f:
+            records = json.load(f)
+    else:
+        records = pd.read_csv(manifest_path, sep=None, engine="python", dtype=str).to_dict("records")
+
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    pairs = []
+    for i, rec in enumerate(records, start=1):
+        missing = [k for k in ("sap", "raben") if not rec.get(k)]
+        if missing:
+            raise ValueError(f"Manifest, záznam {i}: chybí {', '.join(missing)}")
+        pairs.append({
+            "name": rec.get("name") or f"par_{i}",
+            "sap": os.path.join(base, rec["sap"]),
+            "raben": os.path.join(base, rec["raben"]),
+        })
+    return pairs
+
+def discover_pairs(root_dir):
+    """
+    Každá podsložka root_dir se souborem SAP (xlsx/csv/txt) a RABEN.xlsx je jedna dvojice.
+    """
+    pairs = []
+    for name in sorted(os.listdir(root_dir)):
+        folder = os.path.join(root_dir, name)
+        if not os.path.isdir(folder):
+            continue
+        sap_candidates = [os.path.join(folder, "SAP" + ext) for ext in (".xlsx",) + FLAT_FILE_EXTENSIONS]
+        sap = next((p for p in sap_candidates if os.path.exists(p)), None)
+        raben = os.path.join(folder, "RABEN.xlsx")
+        if sap and os.path.exists(raben):
+            pairs.append({"name": name, "sap": sap, "raben": raben})
+        else:
+            log.warning(f"⚠️ Varování: Složka '{folder}' neobsahuje SAP i RABEN, přeskakuji.")
+    return pairs
+
+def run_pair(pair, output_root):
+    """
+    Celý řetězec pro jednu dvojici (běží v samostatném procesu).
+    Výstup jde do output_root/<name>, výpisy do jeho beh.log, metriky kroků do behy.jsonl.
+    Chyba se vrací jako záznam v indexu, nikdy neukončí celou dávku.
+    """
+    output_dir = os.path.join(output_root, pair["name"])
+    os.makedirs(output_dir, exist_ok=True)
+    result = {"name": pair["name"], "sap": pair["sap"], "raben": pair["raben"],
+              "vystup": os.path.join(output_dir, RESULT_FILE)}
+
+    start_run(os.path.join(output_dir, RUN_REPORT_FILE))
+    start = time.perf_counter()
+    with open(os.path.join(output_dir, LOG_FILE), "w", encoding="utf-8") as log_file, \
+            contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(log_file):
+        try:
+            # Paralelní jsou už dvojice, vnořený pool by jen přetížil jádra (a obešel beh.log)
+            df = run_pipeline(pair["sap"], pair["raben"], output_dir, concurrent=False)
+            counts = df["STAV"].value_counts()
+            result.update({
+                "stav": "OK",
+                "klicu": len(df),
+                STAV_OK: int(counts.get(STAV_OK, 0)),
+                STAV_MANKO: int(counts.get(STAV_MANKO, 0)),
+                STAV_PREBYTEK: int(counts.get(STAV_PREBYTEK, 0)),
+                "chyba": "",
+            })
+        except BaseException as e:
+            # I SystemExit / KeyboardInterrupt z jedné dvojice zůstane jen u ní
+            traceback.print_exc()
+            result.update({"stav": "CHYBA", "chyba": f"{type(e).__name__}: {e}"})
+    result["sekundy"] = round(time.perf_counter() - start, 2)
+    return result
+
+def run_batch(pairs, output_root=BATCH_OUTPUT_DIR, workers=None):
+    """
+    Zpracuje všechny dvojice paralelně v process poolu (výchozí počet = počet jader)
+    a zapíše souhrnný index výsledků. Vrací index jako DataFrame.
+    """
+    os.makedirs(output_root, exist_ok=True)
+    names = [p["name"] for p in pairs]
+    if len(set(names)) != len(names):
+        raise ValueError("Názvy dvojic v dávce musí být unikátní (každá má vlastní výstupní složku).")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_pair, pair, output_root): pair for pair in pairs}
+        for future in as_completed(futures):
+            pair = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # Pád celého worker procesu (např. nedostatek paměti)
+                result = {"name": pair["name"], "sap": pair["sap"], "raben": pair["raben"],
+                          "stav": "CHYBA", "chyba": f"{type(e).__name__}: {e}"}
+            icon = "✅" if result["stav"] == "OK" else "❌"
+            log.info(f"{icon} {result['name']}: {result['stav']} {result.get('chyba', '')}".rstrip())
+            results.append(result)
+
+    cols = ["name", "stav", "klicu", STAV_OK, STAV_MANKO, STAV_PREBYTEK, "sekundy", "chyba", "sap", "raben", "vystup"]
+    df_index = pd.DataFrame(results).reindex(columns=cols)
+    df_index = df_index.sort_values("name", ignore_index=True)
+
+    index_path = os.path.join(output_root, INDEX_FILE)
+    write_excel_tables(index_path, [("Index", df_index, "tbl_INDEX", {"widths": column_widths(df_index)})])
+    log.info(f"Index dávky: {index_path}")
+    return df_index
+
+def main():
+    parser = argparse.ArgumentParser(description="Dávkové porovnání více dvojic SAP/RABEN paralelně.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="JSON nebo CSV se sloupci name, sap, raben")
+    source.add_argument("--dir", help="Složka s podsložkami, každá obsahuje SAP.xlsx a RABEN.xlsx")
+    parser.add_argument("--output-dir", default=BATCH_OUTPUT_DIR, help="Kořen výstupů (podsložka na dvojici)")
+    parser.add_argument("--workers", type=int, default=None, help="Počet procesů (výchozí = počet jader)")
+    args = parser.parse_args()
+
+    try:
+        pairs = load_manifest(args.manifest) if args.manifest else discover_pairs(args.dir)
+    except Exception as e:
+        log.error(f"❌ Chyba při načítání seznamu dvojic: {e}")
+        sys.exit(1)
+
+    if not pairs:
+        log.error("❌ CHYBA: Nenašel jsem žádnou dvojici SAP/RABEN.")
+        sys.exit(1)
+
+    log.info(f"--- Dávka: {len(pairs)} dvojic ---")
+    df_index = run_batch(pairs, args.output_dir, args.workers)
+
+    failed = int((df_index["stav"] != "OK").sum())
+    if failed:
+        log.warning(f"⚠️ Dokončeno s chybami: {failed} z {len(df_index)} dvojic selhalo.")
+        sys.exit(1)
+    log.info("✅ Dávka dokončena.")
+
+if __name__ == "__main__":
+    main()
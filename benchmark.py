@@ -0,0 +1,178 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import pandas as pd
+import excel_cache
+from synthetic_data import write_sources
+from utils import find_best_sheet, load_best_sheet, parse_quantity
+from sap_processor import process_file
+from raben_processor import process_raben_file, COLUMN_MAPPING
+from merge_processor import process_merge
+from compare_processor import compare_data, write_report, summarize
+from keys import compute_keys
+from instrumentation import get_logger
+
+log = get_logger("benchmark")
+
+# --- KONFIGURACE ---
+DEFAULT_SIZES = [10_000, 100_000]
+RESULTS_FILE = "benchmark_vysledky.json"
+# Referenční výsledky v repozitáři (výchozí --baseline); obnova: python benchmark.py --output benchmark_baseline.json
+# Časy jsou závislé na stroji, v meta je prostředí, na kterém baseline vznikla
+BASELINE_FILE = "benchmark_baseline.json"
+# Regrese = zpomalení nebo nárůst paměti o víc než THRESHOLD proti baseline ...
+THRESHOLD = 0.25
+# ... a zároveň o víc než absolutní minimum (šum u velmi rychlých kroků)
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 5.0
+
+def measure(fn, repeat=1):
+    """
+    Změří krok: nejlepší čas z repeat běhů (bez tracemalloc) a špičku alokací
+    v jednom dalším běhu pod tracemalloc. Vrací (výsledek, {"sekundy", "pamet_mb"}).
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {"sekundy": round(best, 4), "pamet_mb": round(peak / 1024 / 1024, 2)}
+
+def run_stages(sap_path, raben_path, work_dir, repeat=1):
+    """
+    Projde všechny kroky řetězce nad jednou dvojicí vstupů a vrátí {krok: metriky}.
+    Každý krok dostává výstup předchozího, měří se ale jen on sám.
+    """
+    stages = {}
+
+    def step(name, fn):
+        result, stages[name] = measure(fn, repeat)
+        return result
+
+    step("find_best_sheet", lambda: find_best_sheet(raben_path))
+    _, raw_raben = step("load_best_sheet", lambda: load_best_sheet(raben_path, use_cache=False,
+                                                                       columns=list(COLUMN_MAPPING), dtype=str))
+    step("parse_quantity", lambda: parse_quantity(raw_raben["4-ks"], "RABEN"))
+
+    df_sap = step("sap_processor", lambda: process_file(sap_path))
+    df_raben = step("raben_processor", lambda: process_raben_file(raben_path))
+    df_sap, df_raben = step("merge", lambda: process_merge(df_sap, df_raben))
+    step("compute_keys", lambda: compute_keys(df_sap))
+    df_final = step("reconcile", lambda: compare_data(df_sap, df_raben))
+
+    report_path = os.path.join(work_dir, "vysledky.xlsx")
+    step("write_report", lambda: write_report(report_path, df_final, summarize(df_final)))
+    return stages
+
+def run_benchmark(sizes=DEFAULT_SIZES, repeat=1, seed=0):
+    """
+    Pro každou velikost vygeneruje syntetické SAP.xlsx/RABEN.xlsx a změří všechny kroky.
+    Výpisy zpracování se potlačí, aby neměřily terminál. Cache Excelu je po celou dobu vypnutá:
+    opakování by jinak měřila načtení z cache a do .cache/excel by se zapisovaly velké záznamy.
+    Vrací slovník výsledků pro JSON.
+    """
+    results = {}
+    cache_enabled = excel_cache.CACHE_ENABLED
+    excel_cache.CACHE_ENABLED = False
+    try:
+        for size in sizes:
+            work_dir = tempfile.mkdtemp(prefix=f"bench_{size}_")
+            try:
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    sap_path, raben_path = write_sources(work_dir, size, seed)
+                    results[str(size)] = run_stages(sap_path, raben_path, work_dir, repeat)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+            for name, m in results[str(size)].items():
+                log.info(f"   {size:>9} | {name:<16} | {m['sekundy']:>8.3f} s | {m['pamet_mb']:>8.1f} MB")
+    finally:
+        excel_cache.CACHE_ENABLED = cache_enabled
+
+    return {
+        "meta": {
+            "vytvoreno": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platforma": platform.platform(),
+            "velikosti": list(sizes),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "vysledky": results,
+    }
+
+def find_regressions(current, baseline, threshold=THRESHOLD):
+    """
+    Porovná výsledky s baseline (stejná velikost a krok). Vrací seznam textových popisů regresí.
+    Kroky nebo velikosti, které v baseline nejsou, se přeskočí.
+    """
+    regressions = []
+    for size, stages in current["vysledky"].items():
+        for name, m in stages.items():
+            base = baseline.get("vysledky", {}).get(size, {}).get(name)
+            if not base:
+                continue
+            for metric, minimum, unit in (("sekundy", MIN_SECONDS, "s"), ("pamet_mb", MIN_PEAK_MB, "MB")):
+                old, new = base[metric], m[metric]
+                if new > old * (1 + threshold) and new - old > minimum:
+                    regressions.append(f"{size} řádků, {name}: {metric} {old} -> {new} {unit} "
+                                       f"(+{(new / old - 1) * 100 if old else float('inf'):.0f} %)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark kroků porovnání skladů nad syntetickými daty.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Počty řádků SAP exportu")
+    parser.add_argument("--repeat", type=int, default=1, help="Počet měřených opakování (bere se nejlepší čas)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_FILE, help="Kam uložit výsledky (JSON)")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help=f"JSON s baseline výsledky pro kontrolu regresí (výchozí {BASELINE_FILE}, pokud existuje; "
+                             f"'' = bez kontroly)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Povolené zhoršení (0.25 = 25 %%)")
+    args = parser.parse_args()
+
+    # Baseline se načte předem: --output může být tentýž soubor (obnova baseline)
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    elif args.baseline and args.baseline != BASELINE_FILE:
+        log.error(f"❌ Baseline neexistuje: {args.baseline}")
+        sys.exit(1)
+
+    log.info(f"--- Benchmark: velikosti {', '.join(map(str, args.sizes))} ---")
+    results = run_benchmark(args.sizes, args.repeat, args.seed)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    log.info(f"Výsledky uloženy: {args.output}")
+
+    if baseline:
+        log.info(f"Baseline: {args.baseline} ({baseline.get('meta', {}).get('vytvoreno', '?')})")
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            log.error(f"❌ Regrese proti {args.baseline}:")
+            for line in regressions:
+                log.error(f"   -> {line}")
+            sys.exit(1)
+        log.info(f"✅ Bez regresí proti {args.baseline}.")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
 import pandas as pd
-import openpyxl
-from openpyxl.styles import Font, PatternFill
+import numpy as np
+from openpyxl.styles import PatternFill
+from openpyxl.formatting.rule import FormulaRule
 from openpyxl.utils import get_column_letter
+import argparse
 import os
 import sys
+from keys import KEY_COLUMN, ensure_keys
+from utils import (write_excel_tables, column_widths, read_excel_sheet, shard_frame, write_data_file,
+                   check_data_format, EXCEL_MAX_ROWS, DATA_FORMATS, to_units, from_units, check_units,
+                   decimal_quantities)
+from delta import SNAPSHOT_FILE, compute_delta, load_snapshot, save_snapshot
+from history import HISTORY_FILE, record_run, cutoff_arg
+from instrumentation import get_logger, stage
+
+log = get_logger("compare")
 
 # --- KONFIGURACE ---
 INPUT_FILE = "sklady_porovnani/input/POROVNANI_SKLADU.xlsx"
@@ -14,144 +25,328 @@ COLOR_OK = "C6EFCE"       # Světle zelená
 COLOR_MANKO = "FFC7CE"    # Světle červená
 COLOR_PREBYTEK = "FFEB9C" # Oranžová
 
-def create_hash_col(df):
+# Hodnoty sloupce STAV
+STAV_OK = "STAV OK"
+STAV_MANKO = "RABEN manko"
+STAV_PREBYTEK = "RABEN přebytek"
+
+FINAL_COLS = ["Material", "Nazev", "Batch", "Mnozstvi_SAP", "Mnozstvi_RABEN", "Rozdil", "STAV"]
+# Sloupce čtené z POROVNANI_SKLADU.xlsx
+INPUT_COLS = ["Material", "Nazev", "Batch", "Mnozstvi_SAP", "Mnozstvi_RABEN", KEY_COLUMN]
+# Sloupce množství (v paměti celé jednotky, do výstupů desetinně), včetně listu Zmeny
+QTY_COLS = ["Mnozstvi_SAP", "Mnozstvi_RABEN", "Rozdil",
+            "Mnozstvi_SAP_PREV", "Mnozstvi_RABEN_PREV", "Rozdil_PREV"]
+
+# Náhled největších rozdílů (--preview): sešit se zapíše hned po párování, před celým reportem
+PREVIEW_TOP = 50
+PREVIEW_FILE = "sklady_porovnani/output/nahled.xlsx"
+
+# Výstup výsledků: xlsx (list Vysledky), nebo datový soubor + souhrnný sešit
+OUTPUT_FORMATS = ("xlsx",) + DATA_FORMATS
+# Výsledky nad limit listu se dělí na listy Vysledky_1, Vysledky_2, ... po tolika řádcích
+SHEET_ROWS = EXCEL_MAX_ROWS - 1
+# Kolik listů výsledků nejvýše v jednom datovém sešitu (větší sešity se v Excelu špatně otevírají)
+SHEETS_PER_FILE = 4
+
+def load_inputs(input_file=INPUT_FILE):
     """
-    Vytvoří pomocný sloupec HASH spojením Material a Batch.
+    Načte listy SAP a RABEN z POROVNANI_SKLADU.xlsx (vše jako text, abychom neztratili nuly).
     """
-    mat = df['Material'].astype(str).str.strip().replace('nan', '')
-    bat = df['Batch'].astype(str).str.strip().replace('nan', '')
-    return mat + "_" + bat
+    if not os.path.exists(input_file):
+        # V rámci workflow to může znamenat, že předchozí krok selhal
+        raise FileNotFoundError(f"Vstupní soubor neexistuje: {input_file}")
 
-def compare_data():
-    print(f"--- Spouštím porovnání dat: {INPUT_FILE} ---")
+    log.info("Načítám SAP a RABEN...")
+    df_sap = read_excel_sheet(input_file, "SAP", dtype=str, usecols=lambda c: c in INPUT_COLS)
+    df_raben = read_excel_sheet(input_file, "RABEN", dtype=str, usecols=lambda c: c in INPUT_COLS)
+    # Množství jsou v souboru desetinná -> celé jednotky
+    df_sap["Mnozstvi_SAP"] = to_units(df_sap["Mnozstvi_SAP"])
+    df_raben["Mnozstvi_RABEN"] = to_units(df_raben["Mnozstvi_RABEN"])
+    return df_sap, df_raben
 
-    if not os.path.exists(INPUT_FILE):
-        print(f"❌ CHYBA: Vstupní soubor neexistuje: {INPUT_FILE}")
-        # V rámci workflow to může znamenat, že předchozí krok selhal
-        sys.exit(1)
+def _as_text(series):
+    """
+    Převede sloupec na text stejně jako čtení s dtype=str (chybějící hodnoty zůstávají NaN).
+    """
+    return series.astype(str).where(series.notna())
 
-    try:
-        # 1. Načtení dat (vše jako text, abychom neztratili nuly)
-        print("Načítám SAP a RABEN...")
-        df_sap = pd.read_excel(INPUT_FILE, sheet_name="SAP", dtype=str)
-        df_raben = pd.read_excel(INPUT_FILE, sheet_name="RABEN", dtype=str)
-
-        # 2. Příprava klíčů (HASH)
-        df_sap['HASH'] = create_hash_col(df_sap)
-        df_raben['HASH'] = create_hash_col(df_raben)
-
-        # Převod množství na čísla pro výpočet
-        df_sap['Mnozstvi_SAP'] = pd.to_numeric(df_sap['Mnozstvi_SAP'], errors='coerce').fillna(0)
-        df_raben['Mnozstvi_RABEN'] = pd.to_numeric(df_raben['Mnozstvi_RABEN'], errors='coerce').fillna(0)
-
-        # 3. Spojení (Full Outer Join)
-        print("Provádím párování (Outer Join)...")
-        df_merged = pd.merge(
-            df_sap, 
-            df_raben, 
-            on='HASH', 
-            how='outer', 
-            suffixes=('_SAP', '_RABEN')
-        )
-
-        # 4. Konsolidace sloupců (Coalesce - když chybí v SAP, vezmi z RABEN a naopak)
-        print("Konsoliduji data...")
-        df_merged['Material'] = df_merged['Material_SAP'].combine_first(df_merged['Material_RABEN'])
-        df_merged['Nazev'] = df_merged['Nazev_SAP'].combine_first(df_merged['Nazev_RABEN'])
-        df_merged['Batch'] = df_merged['Batch_SAP'].combine_first(df_merged['Batch_RABEN'])
-
-        # Doplnění 0 tam, kde data chybí (např. zboží je jen v SAPu -> RABEN = 0)
-        df_merged['Mnozstvi_SAP'] = df_merged['Mnozstvi_SAP'].fillna(0)
-        df_merged['Mnozstvi_RABEN'] = df_merged['Mnozstvi_RABEN'].fillna(0)
-
-        # 5. Výpočty a STAV
-        df_merged['Rozdil'] = df_merged['Mnozstvi_RABEN'] - df_merged['Mnozstvi_SAP']
-
-        def urcit_stav(row):
-            diff = row['Rozdil']
-            if diff == 0:
-                return "STAV OK"
-            elif diff > 0:
-                return "RABEN manko"    # Dle zadání: Rozdíl > 0 (RABEN má víc? Pozor, ověř logiku "manko/přebytek")
-                # Obvykle: Manko = chybí fyzicky (RABEN < SAP). 
-                # Zde dle tvého zadání: Rozdil = RABEN - SAP.
-                # Pokud Rozdil > 0 (RABEN > SAP), je to "RABEN manko" (dle tvého promptu).
-                # (Technicky je to přebytek ve skladu, ale držím se přesně tvého zadání textů).
-            else:
-                return "RABEN přebytek" # Dle zadání: Rozdil < 0
-
-        df_merged['STAV'] = df_merged.apply(urcit_stav, axis=1)
-
-        # 6. Finální výběr
-        final_cols = ["Material", "Nazev", "Batch", "Mnozstvi_SAP", "Mnozstvi_RABEN", "Rozdil", "STAV"]
-        df_final = df_merged[final_cols]
-
-        # 7. Uložení
-        print(f"Ukládám do: {OUTPUT_FILE}")
-        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-        
-        with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl') as writer:
-            df_final.to_excel(writer, sheet_name='Vysledky', index=False)
+def aggregate_by_key(df, qty_col):
+    """
+    Sečte množství za každý klíč (např. šarže rozdělená na více palet v RABEN).
+    Material/Nazev/Batch bere z prvního neprázdného řádku klíče.
+    """
+    return df.groupby(KEY_COLUMN, sort=False).agg(
+        Material=("Material", "first"),
+        Nazev=("Nazev", "first"),
+        Batch=("Batch", "first"),
+        **{qty_col: (qty_col, "sum")},
+    )
 
-        # 8. Formátování
-        apply_formatting(OUTPUT_FILE)
-        
-        print("✅ Hotovo. Report vygenerován.")
+def urcit_stav(rozdil, manko=STAV_MANKO, prebytek=STAV_PREBYTEK, name="STAV"):
+    """
+    Vektorové určení STAV ze sloupce Rozdil (= RABEN - SAP).
+    manko/prebytek: texty stavů pro jiného poskytovatele než RABEN (viz multi_compare).
+    """
+    # Dle zadání: Rozdíl > 0 (RABEN má víc) je "RABEN manko", Rozdil < 0 je "RABEN přebytek".
+    # Obvykle: Manko = chybí fyzicky (RABEN < SAP), ale držíme se přesně zadaných textů.
+    stav = np.select([rozdil == 0, rozdil > 0], [STAV_OK, manko], default=prebytek)
+    return pd.Series(stav, index=rozdil.index, name=name)
 
-    except Exception as e:
-        print(f"❌ Chyba při porovnávání: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+def summarize(df_result):
+    """
+    Souhrn po STAV: počet klíčů a součty množství. Obsahuje vždy všechny tři stavy.
+    """
+    summary = df_result.groupby("STAV").agg(
+        Pocet=("STAV", "size"),
+        Mnozstvi_SAP=("Mnozstvi_SAP", "sum"),
+        Mnozstvi_RABEN=("Mnozstvi_RABEN", "sum"),
+        Rozdil=("Rozdil", "sum"),
+    )
+    summary = summary.reindex([STAV_OK, STAV_MANKO, STAV_PREBYTEK], fill_value=0)
+    return summary.rename_axis("STAV").reset_index()
+
+def top_differences(df_final, top=PREVIEW_TOP):
+    """
+    Top-N klíčů podle |Rozdil| přes nlargest (částečný výběr, celý výsledek se neřadí).
+    Klíče bez rozdílu se nevrací, při shodě rozhoduje pořadí ve výsledku (Material, Batch).
+    """
+    abs_diff = df_final["Rozdil"].abs()
+    order = abs_diff[abs_diff > 0].nlargest(top, keep="first").index
+    return df_final.loc[order, FINAL_COLS].reset_index(drop=True)
+
+def write_preview(preview_path, df_top, df_summary):
+    """
+    Vypíše náhled (souhrn po STAV + top rozdíly) do logu a volitelně do malého sešitu
+    s listy Top a Souhrn (stejné formátování jako Vysledky).
+    """
+    df_top = decimal_quantities(df_top, QTY_COLS)
+    df_summary = decimal_quantities(df_summary, QTY_COLS)
+    log.info(f"Náhled: {len(df_top)} největších rozdílů\n{df_top.to_string(index=False)}")
+    if preview_path:
+        os.makedirs(os.path.dirname(preview_path) or ".", exist_ok=True)
+        write_excel_tables(preview_path, [("Top", df_top, None, result_format(df_top)),
+                                          ("Souhrn", df_summary, None, _summary_format(df_summary))])
+
+def reconcile(df_sap, df_raben):
+    """
+    Párování SAP vs RABEN po klíčích: obě strany se nejdřív agregují podle HASH,
+    takže výstup i čas jsou omezeny počtem různých klíčů (žádný kartézský součin duplicit).
+    Vrací dvojici (výsledek po klíčích, souhrn po STAV).
+    """
+    sap = aggregate_by_key(df_sap, 'Mnozstvi_SAP')
+    raben = aggregate_by_key(df_raben, 'Mnozstvi_RABEN')
+
+    # Full Outer Join přes index (klíče jsou po agregaci unikátní)
+    log.info("Provádím párování (Outer Join)...")
+    df_merged = sap.join(raben, how='outer', lsuffix='_SAP', rsuffix='_RABEN')
+
+    # Konsolidace sloupců (Coalesce - když chybí v SAP, vezmi z RABEN a naopak)
+    for col in ["Material", "Nazev", "Batch"]:
+        df_merged[col] = df_merged[f"{col}_SAP"].fillna(df_merged[f"{col}_RABEN"])
 
-def apply_formatting(file_path):
+    # Doplnění 0 tam, kde data chybí (např. zboží je jen v SAPu -> RABEN = 0);
+    # outer join udělá z int64 float, vracíme původní typ (celé jednotky zůstanou celé)
+    df_merged['Mnozstvi_SAP'] = df_merged['Mnozstvi_SAP'].fillna(0).astype(sap['Mnozstvi_SAP'].dtype)
+    df_merged['Mnozstvi_RABEN'] = df_merged['Mnozstvi_RABEN'].fillna(0).astype(raben['Mnozstvi_RABEN'].dtype)
+
+    # Výpočty a STAV
+    df_merged['Rozdil'] = df_merged['Mnozstvi_RABEN'] - df_merged['Mnozstvi_SAP']
+    df_merged['STAV'] = urcit_stav(df_merged['Rozdil'])
+
+    # Finální výběr, pořadí podle materiálu a šarže (int64 klíč sám o sobě žádné smysluplné pořadí nemá)
+    # Klíč HASH zůstává ve výsledku (snapshot, delta), do reportu se nepíše
+    df_final = df_merged.reset_index()[FINAL_COLS + [KEY_COLUMN]]
+    df_final = df_final.sort_values(["Material", "Batch"], kind="mergesort", ignore_index=True)
+    return df_final, summarize(df_final)
+
+def compare_data(df_sap, df_raben, output_path=None, snapshot_path=None, delta=False, output_format="xlsx",
+                 history_path=None, cutoff=None, preview=None, preview_path=None, units=True):
     """
-    Otevře Excel a aplikuje podmíněné formátování řádků.
+    Porovná SAP a RABEN (viz reconcile) a vrátí výsledný DataFrame po klíčích.
+    Report (list Vysledky včetně formátování + list Souhrn) zapisuje jen při zadaném output_path,
+    velké výsledky a jiné formáty viz write_report.
+    snapshot_path: kam uložit snapshot běhu (klíč, množství, STAV) pro příští delta porovnání.
+    delta=True: porovná výsledek se snapshotem předchozího běhu a přidá list Zmeny.
+    history_path: kam připsat běh do historie (viz history.record_run), cutoff = datum stavu skladu.
+    preview=N: hned po párování vypíše N největších rozdílů a souhrn (viz write_preview, sešit
+    preview_path), ještě před delta porovnáním a zápisem reportu. Bez output_path se report nepíše.
+    units=True (výchozí): Mnozstvi_SAP/Mnozstvi_RABEN jsou v celých jednotkách jako výstup procesorů,
+    process_merge a load_inputs; jiný typ sloupce je chyba (viz check_units).
+    units=False: vlastní tabulky s desetinnými množstvími (i celá čísla = kusy), převedou se přes to_units.
+    Vrácený výsledek má množství v celých jednotkách.
     """
-    print("Aplikuji barevné formátování...")
-    wb = openpyxl.load_workbook(file_path)
-    ws = wb['Vysledky']
+    log.info("--- Spouštím porovnání dat ---")
+
+    with stage("compare.prepare", rows_in=len(df_sap) + len(df_raben)) as st:
+        # 1. Textové sloupce sjednotíme na text (v paměti mohou přijít i čísla)
+        df_sap = df_sap.copy()
+        df_raben = df_raben.copy()
+        for df in (df_sap, df_raben):
+            for col in ["Material", "Nazev", "Batch"]:
+                df[col] = _as_text(df[col])
+
+        # 2. Příprava klíčů (HASH) - převezme int64 klíč z merge kroku, případně ho dopočítá
+        df_sap[KEY_COLUMN] = ensure_keys(df_sap)
+        df_raben[KEY_COLUMN] = ensure_keys(df_raben)
+
+        # Množství v celých jednotkách (int64) - součty i Rozdil == 0 jsou přesné
+        if units:
+            check_units(df_sap, ['Mnozstvi_SAP'])
+            check_units(df_raben, ['Mnozstvi_RABEN'])
+        else:
+            df_sap['Mnozstvi_SAP'] = to_units(df_sap['Mnozstvi_SAP'])
+            df_raben['Mnozstvi_RABEN'] = to_units(df_raben['Mnozstvi_RABEN'])
+        st["rows_out"] = len(df_sap) + len(df_raben)
+
+    # 3.-6. Agregace podle klíče, párování a STAV
+    with stage("compare.reconcile", rows_in=len(df_sap) + len(df_raben)) as st:
+        df_final, df_summary = reconcile(df_sap, df_raben)
+        st["rows_out"] = len(df_final)
+    log.info(f"Výsledek: {len(df_final)} klíčů Material+Batch")
+    for row in df_summary.itertuples(index=False):
+        log.info(f"   -> {row.STAV}: {row.Pocet} klíčů, rozdíl celkem {from_units(row.Rozdil)}")
+
+    if preview:
+        with stage("compare.preview", rows_in=len(df_final)) as st:
+            df_top = top_differences(df_final, preview)
+            write_preview(preview_path, df_top, df_summary)
+            st["rows_out"] = len(df_top)
 
-    # Styly
-    fill_ok = PatternFill(start_color=COLOR_OK, end_color=COLOR_OK, fill_type="solid")
-    fill_manko = PatternFill(start_color=COLOR_MANKO, end_color=COLOR_MANKO, fill_type="solid")
-    fill_prebytek = PatternFill(start_color=COLOR_PREBYTEK, end_color=COLOR_PREBYTEK, fill_type="solid")
-    
-    header_font = Font(bold=True)
-    for cell in ws[1]:
-        cell.font = header_font
+    # Delta proti předchozímu běhu (jen změněné, nové a zmizelé klíče)
+    df_changes = None
+    if delta:
+        with stage("compare.delta", rows_in=len(df_final)) as st:
+            df_changes = compute_delta(df_final, load_snapshot(snapshot_path) if snapshot_path else None)
+            st["rows_out"] = len(df_changes)
+        log.info(f"Změny od posledního běhu: {len(df_changes)} klíčů")
 
-    # Barvení řádků podle sloupce STAV (7. sloupec, index G)
-    for row in ws.iter_rows(min_row=2):
-        stav_cell = row[6] # Index 6 = 7. sloupec (G)
-        stav_val = stav_cell.value 
+    # 7. Uložení
+    if output_path:
+        log.info(f"Ukládám do: {output_path}")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
         
-        target_fill = None
-        if stav_val == "STAV OK":
-            target_fill = fill_ok
-        elif stav_val == "RABEN manko":
-            target_fill = fill_manko
-        elif stav_val == "RABEN přebytek":
-            target_fill = fill_prebytek
-            
-        if target_fill:
-            for cell in row:
-                cell.fill = target_fill
-
-    # Autofit šířky sloupců
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter # Get the column name
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-
-    wb.save(file_path)
+        # 8. Formátování se zapisuje rovnou s daty (bez druhého otevření souboru)
+        if output_format == "xlsx":
+            log.info("Aplikuji barevné formátování...")
+        with stage("compare.write", rows_in=len(df_final)):
+            write_report(output_path, df_final, df_summary, df_changes, output_format)
+        
+        log.info("✅ Hotovo. Report vygenerován.")
+
+    # Snapshot až po delta porovnání, aby se porovnávalo s předchozím během
+    if snapshot_path:
+        with stage("compare.snapshot", rows_in=len(df_final)):
+            save_snapshot(df_final, snapshot_path)
+
+    if history_path:
+        with stage("compare.history", rows_in=len(df_final)):
+            record_run(df_final, history_path, cutoff=cutoff)
+
+    return df_final
+
+def _summary_format(df):
+    return {"bold_header": True, "widths": column_widths(df)}
+
+def write_report(output_path, df_final, df_summary, df_changes=None, output_format="xlsx", sheet_rows=None):
+    """
+    Zapíše výsledky porovnání (množství v celých jednotkách, jako vrací reconcile/compare_data).
+    Vrací seznam zapsaných souborů (první je vždy output_path).
+      - xlsx, výsledek se vejde na list: jeden sešit s listy Vysledky, Souhrn (a Zmeny) jako dosud.
+      - xlsx nad limit listu: výsledky v <název>_data_N.xlsx po listech Vysledky_1, Vysledky_2, ...
+        (po SHEETS_PER_FILE listech na sešit) se stejným formátováním a šířkami sloupců.
+      - parquet / csv / feather: výsledky v <název>.<formát> bez openpyxl.
+    Mimo první případ je output_path malý souhrnný sešit: Souhrn, Zmeny a list Soubory s tím,
+    kde výsledky leží (soubor, list, počet řádků, rozsah materiálů).
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Neznámý výstupní formát '{output_format}' (povolené: {', '.join(OUTPUT_FORMATS)})")
+    sheet_rows = sheet_rows or SHEET_ROWS
+    # Celé jednotky -> desetinná čísla až tady, při zápisu
+    df_out = decimal_quantities(df_final[FINAL_COLS], QTY_COLS)
+    df_summary = decimal_quantities(df_summary, QTY_COLS)
+    if df_changes is not None:
+        df_changes = decimal_quantities(df_changes, QTY_COLS)
+
+    summary_sheets = [("Souhrn", df_summary, None, _summary_format(df_summary))]
+    if df_changes is not None:
+        summary_sheets.append(("Zmeny", df_changes, None, _summary_format(df_changes)))
+
+    if output_format == "xlsx" and len(df_out) <= sheet_rows:
+        write_excel_tables(output_path, [("Vysledky", df_out, None, result_format(df_out))] + summary_sheets)
+        return [output_path]
+
+    base = os.path.splitext(output_path)[0]
+    written, parts = [], []
+
+    def part(path, sheet, df):
+        parts.append({"Soubor": os.path.basename(path), "List": sheet, "Radku": len(df),
+                      "Material_od": df["Material"].iloc[0] if len(df) else None,
+                      "Material_do": df["Material"].iloc[-1] if len(df) else None})
+
+    if output_format == "xlsx":
+        # Šířky z celého výsledku, aby všechny listy vypadaly stejně
+        widths = column_widths(df_out)
+        shards = shard_frame(df_out, sheet_rows)
+        log.info(f"Výsledek ({len(df_out)} řádků) přesahuje list, dělím na {len(shards)} listů.")
+        for start in range(0, len(shards), SHEETS_PER_FILE):
+            path = f"{base}_data_{start // SHEETS_PER_FILE + 1}.xlsx"
+            sheets = []
+            for i, shard in enumerate(shards[start:start + SHEETS_PER_FILE], start=start + 1):
+                sheets.append((f"Vysledky_{i}", shard, None, result_format(shard, widths)))
+                part(path, f"Vysledky_{i}", shard)
+            write_excel_tables(path, sheets)
+            written.append(path)
+    else:
+        path = f"{base}.{output_format}"
+        write_data_file(df_out, path, output_format)
+        part(path, "", df_out)
+        written.append(path)
+
+    df_parts = pd.DataFrame(parts)
+    write_excel_tables(output_path, summary_sheets + [("Soubory", df_parts, None, _summary_format(df_parts))])
+    return [output_path] + written
+
+def result_format(df, widths=None, labels=(STAV_OK, STAV_MANKO, STAV_PREBYTEK)):
+    """
+    Formát listu Vysledky pro write_excel_tables: tučná hlavička, šířky sloupců
+    spočtené z DataFrame (nebo zadané widths) a barvení řádků podle STAV jako podmíněné
+    formátování listu. Cena formátování tak nezávisí na počtu buněk.
+    labels: texty stavů (OK, manko, přebytek) v pořadí barev.
+    """
+    last_row = max(len(df), 1) + 1
+    data_range = f"A2:{get_column_letter(len(df.columns))}{last_row}"
+    stav_col = get_column_letter(df.columns.get_loc("STAV") + 1)
+
+    conditional = []
+    for stav, color in zip(labels, (COLOR_OK, COLOR_MANKO, COLOR_PREBYTEK)):
+        fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
+        rule = FormulaRule(formula=[f'${stav_col}2="{stav}"'], fill=fill, stopIfTrue=True)
+        conditional.append((data_range, rule))
+
+    return {"bold_header": True, "widths": widths or column_widths(df), "conditional": conditional}
+
+def main():
+    parser = argparse.ArgumentParser(description="Porovnání SAP vs RABEN z POROVNANI_SKLADU.xlsx.")
+    parser.add_argument("--delta", action="store_true",
+                        help="Přidat list Zmeny se změnami proti předchozímu běhu")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="xlsx",
+                        help="Formát výsledků; mimo xlsx vznikne datový soubor a souhrnný sešit vysledky.xlsx")
+    parser.add_argument("--cutoff", type=cutoff_arg,
+                        help="Datum stavu skladu pro historii (YYYY-MM-DD, výchozí dnešek)")
+    parser.add_argument("--preview", type=int, metavar="N",
+                        help=f"Hned po párování vypsat N největších rozdílů a uložit je do {PREVIEW_FILE}")
+    parser.add_argument("--no-report", action="store_true", help="Nezapisovat celý report vysledky.xlsx")
+    args = parser.parse_args()
+
+    try:
+        check_data_format(args.format)
+        df_sap, df_raben = load_inputs()
+        compare_data(df_sap, df_raben, None if args.no_report else OUTPUT_FILE, snapshot_path=SNAPSHOT_FILE,
+                     delta=args.delta, output_format=args.format, history_path=HISTORY_FILE, cutoff=args.cutoff,
+                     preview=args.preview, preview_path=PREVIEW_FILE)
+    except Exception as e:
+        log.exception(f"❌ Chyba při porovnávání: {e}")
+        sys.exit(1)
 
 if __name__ == "__main__":
-    compare_data()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from keys import KEY_COLUMN, KEY_VERSION, compute_keys
+from utils import to_units, decimal_quantities
+from instrumentation import get_logger
+
+log = get_logger("delta")
+
+# --- KONFIGURACE ---
+SNAPSHOT_FILE = "sklady_porovnani/output/posledni_beh.sqlite"
+SNAPSHOT_TABLE = "snapshot"
+
+SNAPSHOT_COLS = [KEY_COLUMN, "Material", "Nazev", "Batch", "Mnozstvi_SAP", "Mnozstvi_RABEN", "STAV"]
+QTY_COLS = ["Mnozstvi_SAP", "Mnozstvi_RABEN"]
+
+# Hodnoty sloupce ZMENA
+ZMENA_NOVY = "nový"
+ZMENA_ZMIZEL = "zmizel"
+ZMENA_MNOZSTVI = "změna množství"
+
+def save_snapshot(df_result, snapshot_path=SNAPSHOT_FILE):
+    """
+    Uloží kompaktní stav běhu (klíč, množství, STAV) do SQLite.
+    Zápis jde přes dočasný soubor, rozepsaný snapshot tedy nikdy nepřepíše ten poslední.
+    df_result má množství v celých jednotkách (výstup compare_data), ukládají se desetinně
+    jako ve starších snapshotech (REAL).
+    """
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    con = sqlite3.connect(tmp_path)
+    try:
+        decimal_quantities(df_result[SNAPSHOT_COLS], QTY_COLS).to_sql(SNAPSHOT_TABLE, con, index=False)
+        con.execute(f"CREATE UNIQUE INDEX idx_{SNAPSHOT_TABLE}_key ON {SNAPSHOT_TABLE} ({KEY_COLUMN})")
+        con.execute("CREATE TABLE meta (created TEXT, key_version INTEGER)")
+        con.execute("INSERT INTO meta VALUES (?, ?)", (datetime.now().isoformat(timespec="seconds"), KEY_VERSION))
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp_path, snapshot_path)
+    log.info(f"   -> Snapshot běhu uložen: {snapshot_path} ({len(df_result)} klíčů)")
+
+def load_snapshot(snapshot_path=SNAPSHOT_FILE):
+    """
+    Načte snapshot předchozího běhu (množství převedená na celé jednotky),
+    nebo None pokud neexistuje. Snapshot se starší verzí klíče dostane klíče přepočítané
+    z uložených Material a Batch.
+    """
+    if not os.path.exists(snapshot_path):
+        return None
+    con = sqlite3.connect(snapshot_path)
+    try:
+        df = pd.read_sql_query(f"SELECT * FROM {SNAPSHOT_TABLE}", con)
+        meta = pd.read_sql_query("SELECT * FROM meta", con)
+    finally:
+        con.close()
+    created = meta["created"].iloc[0] if len(meta) else "?"
+    log.info(f"   -> Snapshot předchozího běhu: {created} ({len(df)} klíčů)")
+    if "key_version" not in meta.columns or meta["key_version"].iloc[0] != KEY_VERSION:
+        df[KEY_COLUMN] = compute_keys(df)
+    return df.assign(**{col: to_units(df[col]) for col in QTY_COLS})
+
+def compute_delta(df_result, df_snapshot):
+    """
+    Změny proti předchozímu běhu: jen klíče, které přibyly, zmizely nebo změnily množství.
+    Nezměněné klíče se do výstupu nedostanou, takže velikost odpovídá churnu, ne skladu.
+    Bez předchozího snapshotu (df_snapshot=None) jsou všechny klíče nové.
+    Obě strany mají množství v celých jednotkách (compare_data, load_snapshot), výstup také.
+    """
+    if df_snapshot is None:
+        df_snapshot = df_result.iloc[:0]
+
+    joined = pd.merge(df_result[SNAPSHOT_COLS], df_snapshot[SNAPSHOT_COLS], on=KEY_COLUMN, how="outer",
+                      suffixes=("", "_PREV"), indicator=True)
+    is_new = joined["_merge"] == "left_only"
+    is_gone = joined["_merge"] == "right_only"
+    is_changed = (joined["_merge"] == "both") & (
+        (joined["Mnozstvi_SAP"] != joined["Mnozstvi_SAP_PREV"])
+        | (joined["Mnozstvi_RABEN"] != joined["Mnozstvi_RABEN_PREV"])
+    )
+    changes = joined[is_new | is_gone | is_changed].copy()
+    changes["ZMENA"] = np.select([is_new[changes.index], is_gone[changes.index]],
+                                 [ZMENA_NOVY, ZMENA_ZMIZEL], default=ZMENA_MNOZSTVI)
+
+    # U zmizelých klíčů bereme popis z minula, aktuální množství je 0
+    for col in ["Material", "Nazev", "Batch"]:
+        changes[col] = changes[col].fillna(changes[f"{col}_PREV"])
+    for col in ["Mnozstvi_SAP", "Mnozstvi_RABEN", "Mnozstvi_SAP_PREV", "Mnozstvi_RABEN_PREV"]:
+        changes[col] = changes[col].fillna(0).astype(np.int64)
+    changes["Rozdil"] = changes["Mnozstvi_RABEN"] - changes["Mnozstvi_SAP"]
+    changes["Rozdil_PREV"] = changes["Mnozstvi_RABEN_PREV"] - changes["Mnozstvi_SAP_PREV"]
+
+    cols = ["Material", "Nazev", "Batch", "ZMENA",
+            "Mnozstvi_SAP_PREV", "Mnozstvi_SAP", "Mnozstvi_RABEN_PREV", "Mnozstvi_RABEN",
+            "Rozdil_PREV", "Rozdil", "STAV_PREV", "STAV"]
+    return changes[cols].sort_values(["Material", "Batch"], kind="mergesort", ignore_index=True)
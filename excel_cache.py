@@ -0,0 +1,127 @@
+import hashlib
+import os
+import pickle
+import pandas as pd
+from instrumentation import get_logger
+
+log = get_logger("excel_cache")
+
+# --- KONFIGURACE ---
+# Cache naparsovaných Excel listů (klíč = obsah souboru + list + volby čtení)
+CACHE_DIR = os.environ.get("SKLADY_CACHE_DIR", ".cache/excel")
+CACHE_MAX_MB = int(os.environ.get("SKLADY_CACHE_MAX_MB", "512"))
+# SKLADY_NO_CACHE=1 (nebo --no-cache v pipeline) cache úplně obejde
+CACHE_ENABLED = not os.environ.get("SKLADY_NO_CACHE")
+
+# Zvýšit při změně logiky načítání, aby se staré záznamy nepoužily
+CACHE_VERSION = 2
+
+CACHE_SUFFIX = ".pkl"
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    """
+    BLAKE2b hash obsahu souboru (čtení po blocích, bez parsování).
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_key(file_path, sheet_name, options):
+    """
+    Klíč záznamu: obsah souboru, list, volby čtení a verze pandas/cache.
+    """
+    payload = repr((
+        file_digest(file_path),
+        sheet_name,
+        sorted((k, repr(v)) for k, v in options.items()),
+        pd.__version__,
+        CACHE_VERSION,
+    ))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key + CACHE_SUFFIX)
+
+def load(key):
+    """
+    Vrátí uloženou hodnotu, nebo None (chybějící či poškozený záznam).
+    """
+    path = _entry_path(key)
+    try:
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warning(f"⚠️ Varování: Poškozený záznam cache {path} ({e}), načítám znovu.")
+        return None
+
+    # Čas posledního použití pro LRU vyřazování
+    os.utime(path, None)
+    return value
+
+def store(key, value):
+    """
+    Uloží hodnotu (pickle protokol 5) atomicky přes dočasný soubor a pak uklidí cache.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(value, f, protocol=5)
+    os.replace(tmp_path, path)
+    evict()
+
+def evict(max_mb=None):
+    """
+    Vyřadí nejdéle nepoužité záznamy, dokud cache nepřesahuje limit velikosti.
+    """
+    limit = (CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+    try:
+        names = [n for n in os.listdir(CACHE_DIR) if n.endswith(CACHE_SUFFIX)]
+    except FileNotFoundError:
+        return
+
+    entries = []
+    for name in names:
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def cached(file_path, sheet_name, options, loader, use_cache=None):
+    """
+    Vrátí výsledek loader() z cache, nebo ho spočítá a uloží.
+    use_cache=None znamená globální nastavení CACHE_ENABLED.
+    """
+    if use_cache is None:
+        use_cache = CACHE_ENABLED
+    if not use_cache:
+        return loader()
+
+    key = cache_key(file_path, sheet_name, options)
+    value = load(key)
+    if value is not None:
+        log.info(f"   -> Cache: {os.path.basename(file_path)} načten z cache (bez parsování Excelu)")
+        return value
+
+    value = loader()
+    try:
+        store(key, value)
+    except OSError as e:
+        log.warning(f"⚠️ Varování: Cache nelze zapsat ({e}).")
+    return value
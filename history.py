@@ -0,0 +1,228 @@
+import argparse
+import os
+import sqlite3
+import sys
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import instrumentation
+from keys import KEY_COLUMN, KEY_VERSION, compute_keys
+from utils import QUANTITY_DECIMALS
+from instrumentation import get_logger
+
+log = get_logger("history")
+
+# --- KONFIGURACE ---
+# Historie všech běhů porovnání (SQLite), připisuje se, nikdy nepřepisuje
+HISTORY_FILE = "sklady_porovnani/output/historie.sqlite"
+
+QTY_COLS = ["Mnozstvi_SAP", "Mnozstvi_RABEN", "Rozdil"]
+HISTORY_COLS = [KEY_COLUMN, "Material", "Nazev", "Batch"] + QTY_COLS + ["STAV"]
+# Výstup stáří rozdílů; Od = cutoff prvního běhu řady se stejným STAV, Behu = délka řady v bězích
+AGING_COLS = ["Material", "Nazev", "Batch", "STAV", "Rozdil", "Od", "Dni", "Behu"]
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY, cutoff TEXT NOT NULL, created TEXT NOT NULL,
+        keys INTEGER NOT NULL, decimals INTEGER NOT NULL)""",
+    f"""CREATE TABLE IF NOT EXISTS history (
+        run_id TEXT NOT NULL, cutoff TEXT NOT NULL, {KEY_COLUMN} INTEGER NOT NULL,
+        Material TEXT, Nazev TEXT, Batch TEXT,
+        Mnozstvi_SAP INTEGER, Mnozstvi_RABEN INTEGER, Rozdil INTEGER, STAV TEXT,
+        Od TEXT, Behu INTEGER)""",
+    "CREATE INDEX IF NOT EXISTS idx_runs_cutoff ON runs (cutoff, created)",
+    f"CREATE INDEX IF NOT EXISTS idx_history_key ON history ({KEY_COLUMN}, cutoff)",
+    "CREATE INDEX IF NOT EXISTS idx_history_material ON history (Material, Batch, cutoff)",
+    "CREATE INDEX IF NOT EXISTS idx_history_stav ON history (STAV, cutoff)",
+    "CREATE INDEX IF NOT EXISTS idx_history_run ON history (run_id, STAV)",
+]
+
+def _rekey(con):
+    """
+    Klíče uložené starší verzí výpočtu (PRAGMA user_version < KEY_VERSION) přepočítá
+    z uložených Material a Batch, aby na ně navázaly nové běhy i dotazy přes HASH.
+    """
+    if con.execute("PRAGMA user_version").fetchone()[0] >= KEY_VERSION:
+        return
+    rows = pd.read_sql_query("SELECT rowid, Material, Batch FROM history", con)
+    if len(rows):
+        log.info(f"   -> Přepočet klíčů historie na verzi {KEY_VERSION} ({len(rows)} řádků)")
+        keys = compute_keys(rows).tolist()
+        with con:
+            con.executemany(f"UPDATE history SET {KEY_COLUMN} = ? WHERE rowid = ?", zip(keys, rows["rowid"].tolist()))
+    con.execute(f"PRAGMA user_version = {KEY_VERSION}")
+
+def connect(history_path=HISTORY_FILE):
+    """
+    Otevře (případně založí) úložiště historie včetně tabulek a indexů.
+    """
+    os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
+    con = sqlite3.connect(history_path)
+    for statement in SCHEMA:
+        con.execute(statement)
+    _rekey(con)
+    return con
+
+def parse_cutoff(value):
+    """
+    Datum stavu skladu -> ISO text (YYYY-MM-DD). Na pořadí cutoff stojí předchozí běh i stáří
+    rozdílů, proto se jiný formát (např. 17.10.2026) odmítá hned, ne až tichým výpadkem v dotazu.
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    try:
+        return date.fromisoformat(str(value).strip()).isoformat()
+    except ValueError:
+        raise ValueError(f"Neplatné datum stavu skladu '{value}' (očekávám YYYY-MM-DD)") from None
+
+def cutoff_arg(value):
+    """
+    parse_cutoff pro argparse (type=), chyba se vypíše jako chyba argumentu.
+    """
+    try:
+        return parse_cutoff(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+def _previous_run(con, run_id, cutoff):
+    row = con.execute("SELECT run_id FROM runs WHERE run_id <> ? AND cutoff <= ? ORDER BY cutoff DESC, created DESC "
+                      "LIMIT 1", (run_id, cutoff)).fetchone()
+    return row[0] if row else None
+
+def _open_since(con, rows, run_id, cutoff):
+    """
+    Doplní Od a Behu otevřeným rozdílům (Rozdil != 0): pokračuje řada z předchozího běhu
+    se stejným STAV, jinak začíná tímto během. Klíče bez rozdílu mají Od/Behu prázdné.
+    """
+    previous = _previous_run(con, run_id, cutoff)
+    prev = pd.read_sql_query(f"SELECT {KEY_COLUMN}, STAV, Od, Behu FROM history WHERE run_id = ? AND Rozdil <> 0",
+                             con, params=(previous,))
+    prev = prev.set_index([KEY_COLUMN, "STAV"])
+    key = pd.MultiIndex.from_arrays([rows[KEY_COLUMN].to_numpy(), rows["STAV"].to_numpy()])
+    hit = prev.reindex(key)
+    is_open = (rows["Rozdil"] != 0).to_numpy()
+    od = hit["Od"].fillna(cutoff).to_numpy(dtype=object)
+    behu = pd.to_numeric(hit["Behu"]).fillna(0).to_numpy(dtype="int64") + 1
+    rows["Od"] = np.where(is_open, od, None)
+    rows["Behu"] = np.where(is_open, behu, None)
+    return rows
+
+def record_run(df_result, history_path=HISTORY_FILE, run_id=None, cutoff=None):
+    """
+    Připíše výsledek běhu (klíč, texty, množství, Rozdil, STAV) do historie.
+    run_id: výchozí = ID běhu z instrumentation (stejné jako v běhovém reportu); opakovaný
+    zápis stejného běhu nahradí jeho řádky. cutoff: datum stavu skladu (výchozí dnešek).
+    df_result je výstup compare_data: množství už jsou v celých jednotkách a tak se i ukládají
+    (INTEGER), počet desetinných míst je u běhu.
+    Stáří rozdílů (Od, Behu) se počítá při zápisu proti poslednímu dřívějšímu běhu,
+    dotaz na stáří pak čte jen řádky posledního běhu. Vrací run_id.
+    """
+    run_id = run_id or instrumentation.current_run()
+    cutoff = parse_cutoff(cutoff or date.today())
+    rows = df_result[HISTORY_COLS].assign(run_id=run_id, cutoff=cutoff)
+    for col in ["Material", "Nazev", "Batch", "STAV"]:
+        rows[col] = rows[col].astype(str).where(rows[col].notna(), None)
+
+    con = connect(history_path)
+    try:
+        with con:
+            con.execute("DELETE FROM history WHERE run_id = ?", (run_id,))
+            con.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            rows = _open_since(con, rows, run_id, cutoff)
+            con.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+                        (run_id, cutoff, datetime.now().isoformat(timespec="seconds"), len(rows), QUANTITY_DECIMALS))
+            cols = ["run_id", "cutoff"] + HISTORY_COLS + ["Od", "Behu"]
+            con.executemany(f"INSERT INTO history ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                            rows[cols].astype(object).itertuples(index=False, name=None))
+    finally:
+        con.close()
+    log.info(f"   -> Běh {run_id} (stav k {cutoff}) připsán do historie: {history_path} ({len(rows)} klíčů)")
+    return run_id
+
+def _query(history_path, sql, params=()):
+    if not os.path.exists(history_path):
+        raise FileNotFoundError(f"Historie neexistuje: {history_path}")
+    con = connect(history_path)
+    try:
+        return pd.read_sql_query(sql, con, params=params)
+    finally:
+        con.close()
+
+def _decimals(df):
+    """
+    Celé jednotky -> desetinná množství podle přesnosti uložené u každého běhu.
+    """
+    scale = np.power(10.0, df.pop("decimals").to_numpy())
+    return df.assign(**{col: df[col] / scale for col in QTY_COLS if col in df.columns})
+
+def key_series(material, batch=None, history_path=HISTORY_FILE):
+    """
+    Časová řada jednoho klíče (Material + Batch) přes všechny běhy, nebo všech šarží materiálu
+    (batch=None). Klíč se hledá přes HASH (stejná normalizace jako při párování), materiál přes index.
+    """
+    select = (f"SELECT h.cutoff, h.run_id, h.Material, h.Nazev, h.Batch, h.Mnozstvi_SAP, h.Mnozstvi_RABEN, "
+              f"h.Rozdil, h.STAV, r.decimals FROM history h JOIN runs r ON r.run_id = h.run_id ")
+    if batch is None:
+        df = _query(history_path, select + "WHERE h.Material = ? ORDER BY h.Batch, h.cutoff, r.created",
+                    (material,))
+    else:
+        key = int(compute_keys(pd.DataFrame({"Material": [material], "Batch": [batch]}))[0])
+        df = _query(history_path, select + f"WHERE h.{KEY_COLUMN} = ? ORDER BY h.cutoff, r.created", (key,))
+    return _decimals(df)
+
+def aging(history_path=HISTORY_FILE, stav=None, min_days=0):
+    """
+    Stáří otevřených rozdílů: klíče, které mají v posledním běhu nenulový Rozdil (nebo STAV stav),
+    a od kdy jsou v tomto stavu bez přerušení. Přerušením je jiný STAV nebo běh, ve kterém klíč chybí.
+    Vrací Material, Nazev, Batch, STAV, Rozdil, Od (cutoff prvního běhu řady), Dni, Behu.
+    """
+    runs = _query(history_path, "SELECT run_id, cutoff FROM runs ORDER BY cutoff DESC, created DESC LIMIT 1")
+    if runs.empty:
+        return pd.DataFrame(columns=AGING_COLS)
+    run_id, cutoff = runs.iloc[0]
+
+    # Jen řádky posledního běhu (index run_id, STAV); Od je ISO datum, porovnává se jako text
+    where, params = "h.run_id = ? AND h.Rozdil <> 0 AND h.Od <= date(?, ?)", (run_id, cutoff, f"-{min_days} days")
+    if stav:
+        where, params = where + " AND h.STAV = ?", params + (stav,)
+    df = _query(history_path,
+                f"SELECT h.Material, h.Nazev, h.Batch, h.STAV, h.Rozdil, h.Od, h.Behu, r.decimals "
+                f"FROM history h JOIN runs r ON r.run_id = h.run_id WHERE {where}", params)
+    df = _decimals(df)
+    df["Dni"] = (pd.Timestamp(cutoff) - pd.to_datetime(df["Od"])).dt.days
+    df = df.sort_values(["Dni", "Material", "Batch"], ascending=[False, True, True], kind="mergesort")
+    return df.reset_index(drop=True)[AGING_COLS]
+
+def main():
+    parser = argparse.ArgumentParser(description="Dotazy do historie porovnání (bez otevírání xlsx).")
+    parser.add_argument("--history", default=HISTORY_FILE, help="Úložiště historie (SQLite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serie = commands.add_parser("serie", help="Časová řada klíče Material (+ Batch) přes běhy")
+    serie.add_argument("--material", required=True)
+    serie.add_argument("--batch", help="Šarže; bez ní všechny šarže materiálu")
+    stari = commands.add_parser("stari", help="Stáří otevřených rozdílů v posledním běhu")
+    stari.add_argument("--stav", help="Jen tento STAV (např. 'RABEN manko'), jinak všechny nenulové rozdíly")
+    stari.add_argument("--min-dni", type=int, default=0, help="Jen rozdíly otevřené aspoň tolik dní")
+    stari.add_argument("--top", type=int, help="Vypsat jen prvních N řádků")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "serie":
+            df = key_series(args.material, args.batch, args.history)
+        else:
+            df = aging(args.history, args.stav, args.min_dni)
+            if args.top:
+                df = df.head(args.top)
+    except Exception as e:
+        log.error(f"❌ Chyba při dotazu do historie: {e}")
+        sys.exit(1)
+
+    if df.empty:
+        log.info("Žádné záznamy.")
+    else:
+        log.info(df.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
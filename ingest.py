@@ -0,0 +1,121 @@
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait
+import excel_cache
+import utils
+import instrumentation
+import sap_processor
+from instrumentation import get_logger, stage
+from sap_processor import process_file
+from raben_processor import process_raben_file
+
+try:
+    import pyarrow as pa
+except ImportError:  # volitelné, bez pyarrow se tabulka vrací přímo (pickle jednou, v executoru)
+    pa = None
+
+log = get_logger("ingest")
+
+# --- KONFIGURACE ---
+# Načíst SAP a RABEN souběžně ve dvou procesech (jen když jsou k dispozici aspoň 2 jádra)
+CONCURRENT_INGEST = not os.environ.get("SKLADY_SEQUENTIAL_INGEST")
+
+SIDES = {"SAP": process_file, "RABEN": process_raben_file}
+
+def worker_settings():
+    """
+    Nastavení z CLI, která musí platit i ve worker procesu (při spawn se moduly importují znovu).
+    """
+    return {
+        "cache_enabled": excel_cache.CACHE_ENABLED,
+        "excel_reader": utils.EXCEL_READER,
+        "flat_file_encoding": sap_processor.FLAT_FILE_ENCODING,
+        "log_level": logging.getLevelName(log.getEffectiveLevel()),
+        "profile_dir": instrumentation.PROFILE_DIR,
+        "trace_memory": instrumentation.TRACE_MEMORY,
+        "run_id": instrumentation.current_run(),
+    }
+
+def _init_worker(settings):
+    excel_cache.CACHE_ENABLED = settings["cache_enabled"]
+    utils.EXCEL_READER = settings["excel_reader"]
+    sap_processor.FLAT_FILE_ENCODING = settings["flat_file_encoding"]
+    instrumentation.set_level(settings["log_level"])
+    instrumentation.PROFILE_DIR = settings["profile_dir"]
+    instrumentation.TRACE_MEMORY = settings["trace_memory"]
+    # Report zapisuje jen hlavní proces, worker záznamy vrací
+    instrumentation.REPORT_FILE = None
+    instrumentation.start_run(run_id=settings["run_id"])
+
+def to_payload(df):
+    """
+    DataFrame -> (formát, data) pro přenos z workeru. Arrow IPC stream, pokud je pyarrow
+    a tabulka jde převést (smíšené typy v category nejdou), jinak DataFrame beze změny;
+    ten serializuje executor sám, vlastní pickle by tabulku kopíroval dvakrát.
+    """
+    if pa is not None:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return "arrow", sink.getvalue().to_pybytes()
+        except (pa.ArrowException, TypeError, ValueError):
+            pass
+    return "frame", df
+
+def from_payload(payload):
+    kind, data = payload
+    if kind == "arrow":
+        return pa.ipc.open_stream(data).read_all().to_pandas()
+    return data
+
+def _ingest(side, input_path, output_path):
+    """
+    Worker: zpracuje jednu stranu a vrátí (payload, záznamy kroků).
+    """
+    # Worker může dostat obě strany po sobě, záznamy se vrací jen za tuto
+    instrumentation.start_run(run_id=instrumentation.current_run())
+    df = SIDES[side](input_path, output_path)
+    return to_payload(df), instrumentation.run_records()
+
+def ingest_sequential(sap_path, raben_path, sap_out=None, raben_out=None):
+    return process_file(sap_path, sap_out), process_raben_file(raben_path, raben_out)
+
+def ingest_sources(sap_path, raben_path, sap_out=None, raben_out=None, concurrent=None):
+    """
+    Načte a zpracuje SAP i RABEN. Souběžně ve dvou procesech (čas ~ pomalejší ze stran),
+    nebo postupně v tomto procesu (concurrent=False, jedno jádro, vypnuto v konfiguraci).
+    Čeká se vždy na obě strany; chyby se hlásí dohromady s označením strany.
+    Vrací (df_sap, df_raben).
+    """
+    if concurrent is None:
+        concurrent = CONCURRENT_INGEST and (os.cpu_count() or 1) > 1
+    if not concurrent:
+        return ingest_sequential(sap_path, raben_path, sap_out, raben_out)
+
+    # Neodeslaný buffer by se ve fork workeru vypsal podruhé
+    sys.stdout.flush()
+    jobs = {"SAP": (sap_path, sap_out), "RABEN": (raben_path, raben_out)}
+    with stage("ingest") as st:
+        with ProcessPoolExecutor(max_workers=len(jobs), initializer=_init_worker,
+                                 initargs=(worker_settings(),)) as pool:
+            futures = {side: pool.submit(_ingest, side, *args) for side, args in jobs.items()}
+            wait(futures.values())
+
+        frames, errors = {}, []
+        for side, future in futures.items():
+            try:
+                payload, records = future.result()
+            except Exception as e:
+                errors.append((side, e))
+                continue
+            instrumentation.add_records(records)
+            frames[side] = from_payload(payload)
+
+        if errors:
+            message = "; ".join(f"{side}: {type(e).__name__}: {e}" for side, e in errors)
+            raise RuntimeError(f"Zpracování vstupů selhalo ({message})") from errors[0][1]
+        st["rows_out"] = sum(len(df) for df in frames.values())
+    return frames["SAP"], frames["RABEN"]
@@ -0,0 +1,183 @@
+import cProfile
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- KONFIGURACE ---
+LOGGER_NAME = "sklady"
+# DEBUG vypíše i metriky každého kroku, WARNING jen varování a chyby
+LOG_LEVEL = os.environ.get("SKLADY_LOG_LEVEL", "INFO").upper()
+# Cesta k běhovému reportu (JSON lines, jeden řádek na krok); None = nezapisovat
+REPORT_FILE = os.environ.get("SKLADY_RUN_REPORT") or None
+# Složka pro cProfile výpisy po krocích (<krok>.prof); None = neprofilovat
+PROFILE_DIR = os.environ.get("SKLADY_PROFILE_DIR") or None
+# tracemalloc zpomaluje alokace, proto jen na vyžádání
+TRACE_MEMORY = bool(os.environ.get("SKLADY_TRACEMALLOC"))
+
+_run_id = uuid.uuid4().hex[:12]
+_records = []
+
+class _StdoutHandler(logging.StreamHandler):
+    """
+    Píše vždy do aktuálního sys.stdout, takže funguje i redirect_stdout (beh.log v dávce).
+    """
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+def get_logger(name):
+    """
+    Logger pod společným "sklady" loggerem. Při prvním použití se nastaví
+    výpis na stdout ve stejné podobě jako dřívější print.
+    """
+    root = logging.getLogger(LOGGER_NAME)
+    if not root.handlers:
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+    return root.getChild(name)
+
+def set_level(level):
+    """
+    Změní úroveň logování (např. z --log-level v CLI).
+    """
+    get_logger("instrumentation")
+    logging.getLogger(LOGGER_NAME).setLevel(level.upper())
+
+log = get_logger("instrumentation")
+
+def start_run(report_file=None, run_id=None):
+    """
+    Začne nový běh: nové ID (nebo zadané run_id, např. ve worker procesu téhož běhu),
+    prázdný seznam záznamů, volitelně jiný report soubor. Vrací ID běhu.
+    """
+    global _run_id, REPORT_FILE
+    _run_id = run_id or uuid.uuid4().hex[:12]
+    _records.clear()
+    if report_file is not None:
+        REPORT_FILE = report_file
+    return _run_id
+
+def current_run():
+    """
+    ID aktuálního běhu (předává se worker procesům).
+    """
+    return _run_id
+
+def add_records(records):
+    """
+    Převezme záznamy kroků změřené v jiném procesu (worker) do aktuálního běhu a reportu.
+    """
+    for record in records:
+        _records.append(record)
+        if REPORT_FILE:
+            _write_report(record)
+
+def run_records():
+    """
+    Záznamy kroků aktuálního běhu (seznam slovníků, stejné jako řádky reportu).
+    """
+    return list(_records)
+
+def _peak_rss_mb():
+    """
+    Špička RSS celého procesu od jeho startu (ru_maxrss) - jen roste, ke kroku se přičíst nedá.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux vrací KB, macOS bajty
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+def _current_rss_mb():
+    """
+    Aktuální RSS procesu (Linux /proc/self/statm), jinde None.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+def _write_report(record):
+    os.makedirs(os.path.dirname(REPORT_FILE) or ".", exist_ok=True)
+    with open(REPORT_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Změří pojmenovaný krok: čas (wall i CPU), změnu RSS během kroku (rss_delta_mb, jen Linux),
+    špičku RSS celého procesu k jeho konci (process_rss_peak_mb - kumulativní, ne za krok),
+    volitelně špičku tracemalloc (za krok) a cProfile, počty řádků na vstupu a výstupu.
+    Volající doplní výstup přes st["rows_out"] = len(df). Záznam se uloží i při výjimce
+    (status "chyba"), výjimka pak letí dál.
+    """
+    record = {
+        "run": _run_id,
+        "stage": name,
+        "start": datetime.now().isoformat(timespec="milliseconds"),
+        "rows_in": rows_in,
+        "rows_out": None,
+    }
+    # Vnořený krok nesmí vypnout tracemalloc/profil vnějšího
+    trace = TRACE_MEMORY and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    profiler = None
+    if PROFILE_DIR:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            profiler = None
+
+    rss_before = _current_rss_mb()
+    wall, cpu = time.perf_counter(), time.process_time()
+    status, error = "ok", None
+    try:
+        yield record
+    except BaseException as e:
+        status, error = "chyba", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["wall_s"] = round(time.perf_counter() - wall, 4)
+        record["cpu_s"] = round(time.process_time() - cpu, 4)
+        rss_after = _current_rss_mb()
+        record["rss_delta_mb"] = None if rss_before is None or rss_after is None else round(rss_after - rss_before, 1)
+        record["process_rss_peak_mb"] = _peak_rss_mb()
+        record["tracemalloc_peak_mb"] = None
+        if trace:
+            record["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+            tracemalloc.stop()
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{name}.prof"))
+        record["status"] = status
+        record["error"] = error
+
+        _records.append(record)
+        if REPORT_FILE:
+            _write_report(record)
+        log.debug(f"   [{name}] {record['wall_s']} s (CPU {record['cpu_s']} s), "
+                  f"řádky {rows_in} -> {record['rows_out']}, změna RSS {record['rss_delta_mb']} MB "
+                  f"(špička procesu {record['process_rss_peak_mb']} MB)")
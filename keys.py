@@ -0,0 +1,72 @@
+from hashlib import blake2b
+import numpy as np
+import pandas as pd
+
+# Název sloupce s klíčem Material+Batch (v paměti int64, v Excelu 16místný hex)
+KEY_COLUMN = "HASH"
+# Verze výpočtu klíče; klíče uložené v historii/snapshotu se starší verzí se přepočítají
+# (1 = pd.util.hash_pandas_object, 2 = blake2b normalizovaného textu)
+KEY_VERSION = 2
+
+def _normalize(series):
+    """
+    UPPER(TRIM(hodnota)), chybějící hodnota -> prázdný string.
+    """
+    return series.astype(str).where(series.notna(), "").str.strip().str.upper()
+
+def key_text(df):
+    """
+    Normalizovaný textový klíč: UPPER(TRIM(Material)) + '|' + UPPER(TRIM(Batch)).
+    """
+    return _normalize(df["Material"]) + "|" + _normalize(df["Batch"])
+
+def _digest(text):
+    return blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+def compute_keys(df):
+    """
+    64bitový klíč (int64) z Material a Batch: prvních 8 bajtů blake2b z key_text (big-endian).
+    Klíče se ukládají do snapshotu a historie, proto pevný algoritmus nezávislý na verzi pandas
+    (hash_pandas_object stabilitu mezi verzemi neslibuje).
+    """
+    raw = b"".join(map(_digest, key_text(df).tolist()))
+    digest = np.frombuffer(raw, dtype=">i8").astype(np.int64)
+    return pd.Series(digest, index=df.index, name=KEY_COLUMN)
+
+def keys_to_hex(keys):
+    """
+    int64 klíče -> 16místný hex (pro zápis do Excelu, kde by se int64 zaokrouhlil na double).
+    """
+    raw = keys.to_numpy(dtype=np.int64).astype(">i8").tobytes().hex()
+    return pd.Series([raw[i:i + 16] for i in range(0, len(raw), 16)], index=keys.index, name=keys.name)
+
+def hex_to_keys(hex_values):
+    """
+    16místný hex -> int64 klíče (opak keys_to_hex).
+    """
+    raw = bytes.fromhex("".join(hex_values))
+    digest = np.frombuffer(raw, dtype=">i8").astype(np.int64)
+    return pd.Series(digest, index=hex_values.index, name=KEY_COLUMN)
+
+def ensure_keys(df):
+    """
+    Vrátí int64 klíč pro tabulku: převezme uložený sloupec HASH (int64 nebo 16místný hex),
+    jinak ho spočítá z Material a Batch.
+    """
+    if KEY_COLUMN in df.columns:
+        col = df[KEY_COLUMN]
+        if pd.api.types.is_integer_dtype(col):
+            return col.astype(np.int64)
+        if col.notna().all():
+            text = col.astype(str).str.strip()
+            if text.str.fullmatch(r"[0-9a-fA-F]{16}").all():
+                return hex_to_keys(text)
+    return compute_keys(df)
+
+def with_hex_keys(df):
+    """
+    Kopie tabulky se sloupcem HASH převedeným na hex (formát pro uložení do xlsx).
+    """
+    if KEY_COLUMN not in df.columns or not pd.api.types.is_integer_dtype(df[KEY_COLUMN]):
+        return df
+    return df.assign(**{KEY_COLUMN: keys_to_hex(df[KEY_COLUMN])})
@@ -1,103 +1,106 @@
-import pandas as pd
-import openpyxl
-from openpyxl.worksheet.table import Table, TableStyleInfo
 import sys
 import os
-import hashlib
+from utils import write_excel_tables, compact_text, read_excel_sheet, to_units, decimal_quantities, check_units
+from keys import KEY_COLUMN, compute_keys, with_hex_keys
+from rules import load_rules, apply_rules
+from instrumentation import get_logger, stage
 
-def calculate_hash(row):
-    """
-    Vytvoří SHA-256 hash z Material a Batch.
-    Pravidla: UPPER(TRIM(Material)) + '|' + UPPER(TRIM(Batch))
-    """
-    # Získání hodnot, ošetření NaN -> prázdný string
-    mat = str(row['Material']).strip().upper() if pd.notna(row['Material']) else ""
-    batch = str(row['Batch']).strip().upper() if pd.notna(row['Batch']) else ""
-    
-    # Sestavení řetězce
-    raw_string = f"{mat}|{batch}"
-    
-    # Hashování
-    return hashlib.sha256(raw_string.encode('utf-8')).hexdigest()
+log = get_logger("merge")
 
-def create_excel_table(ws, sheet_name, table_name):
-    """Pomocná funkce pro vytvoření Excel tabulky"""
-    max_row = ws.max_row
-    max_col = ws.max_column
-    # Převod čísla sloupce na písmeno (např. 5 -> E)
-    from openpyxl.utils import get_column_letter
-    col_letter = get_column_letter(max_col)
-    
-    ref = f"A1:{col_letter}{max_row}"
-    
-    tab = Table(displayName=table_name, ref=ref)
-    style = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False,
-                           showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-    tab.tableStyleInfo = style
-    ws.add_table(tab)
+# Cesty
+SAP_PATH = "sklady_porovnani/output/SAP.xlsx"
+RABEN_PATH = "sklady_porovnani/output/RABEN.xlsx"
+OUTPUT_PATH = "sklady_porovnani/input/POROVNANI_SKLADU.xlsx"
 
-def process_merge():
-    print("--- Začínám slučování a finální úpravy ---")
-    
-    # Cesty
-    sap_path = "sklady_porovnani/output/SAP.xlsx"
-    raben_path = "sklady_porovnani/output/RABEN.xlsx"
-    output_path = "sklady_porovnani/input/POROVNANI_SKLADU.xlsx"
-    
+# Sloupce, které se z mezivýstupů čtou (ostatní se vůbec neparsují)
+SAP_COLS = ["Material", "Nazev", "Batch", "Mnozstvi_SAP"]
+RABEN_COLS = ["Material", "Nazev", "Batch", "Mnozstvi_RABEN"]
+TEXT_COLS = ["Material", "Nazev", "Batch"]
+QTY_COLS = {"sap": "Mnozstvi_SAP", "raben": "Mnozstvi_RABEN"}
+
+def load_inputs(sap_path=SAP_PATH, raben_path=RABEN_PATH):
+    """
+    Načte vyčištěné výstupy SAP a RABEN (listy SAP/RABEN) z předchozích kroků.
+    Množství jsou v souborech desetinná, převádí se na celé jednotky (viz utils.to_units).
+    """
     # Kontrola vstupů
     if not os.path.exists(sap_path) or not os.path.exists(raben_path):
-        print("❌ Chybí vstupní soubory v output složce (SAP.xlsx nebo RABEN.xlsx).")
-        sys.exit(1)
+        raise FileNotFoundError("Chybí vstupní soubory v output složce (SAP.xlsx nebo RABEN.xlsx).")
 
-    try:
-        # 1. Načtení dat
-        df_sap = pd.read_excel(sap_path, sheet_name="SAP")
-        df_raben = pd.read_excel(raben_path, sheet_name="RABEN")
-        
-        print(f"Načteno: SAP ({len(df_sap)} řádků), RABEN ({len(df_raben)} řádků)")
+    df_sap = read_excel_sheet(sap_path, "SAP", usecols=lambda c: c in SAP_COLS)
+    df_raben = read_excel_sheet(raben_path, "RABEN", usecols=lambda c: c in RABEN_COLS)
+    df_sap[QTY_COLS["sap"]] = to_units(df_sap[QTY_COLS["sap"]])
+    df_raben[QTY_COLS["raben"]] = to_units(df_raben[QTY_COLS["raben"]])
+    return compact_text(df_sap, TEXT_COLS), compact_text(df_raben, TEXT_COLS)
+
+def apply_side_rules(df, side, rules):
+    """
+    Pravidla jedné strany v jednom průchodu; počty zásahů jdou do logu i do běhového reportu.
+    """
+    if not rules[side]:
+        return df
+    with stage(f"merge.{side}_rules", rows_in=len(df)) as st:
+        df, hits = apply_rules(df, rules[side], QTY_COLS[side])
+        st["rows_out"] = len(df)
+        st["rule_hits"] = hits
+    for name, count in hits.items():
+        log.info(f"Pravidlo '{name}' ({side.upper()}): {count} řádků.")
+    return df
+
+def process_merge(df_sap, df_raben, output_path=None, rules=None, units=True):
+    """
+    Finální úpravy dat podle pravidel (merge_rules.json, viz rules.py) a doplnění HASH klíče do obou tabulek.
+    rules: už načtená pravidla (parse_rules/load_rules), výchozí = RULES_FILE.
+    units=True (výchozí): množství jsou v celých jednotkách (int64) jako výstup procesorů
+    a load_inputs; jiný typ sloupce je chyba (viz check_units).
+    units=False: vlastní tabulky s desetinnými množstvími (i celá čísla = kusy), převedou se přes to_units.
+    Vrácená množství jsou v celých jednotkách, desetinná jsou jen v zapsaném souboru.
+    Vrací dvojici (df_sap, df_raben); POROVNANI_SKLADU.xlsx zapisuje jen při zadaném output_path.
+    """
+    log.info("--- Začínám slučování a finální úpravy ---")
+    log.info(f"Načteno: SAP ({len(df_sap)} řádků), RABEN ({len(df_raben)} řádků)")
+
+    if rules is None:
+        rules = load_rules()
 
-        # --- LOGIKA ÚPRAV PRO RABEN ---
-        
-        # A. Filtrace obalů (Maska P*** nebo P****)
-        # Regex: Začátek(^) P, následují 3 nebo 4 číslice(\d{3,4}), Konec($)
-        initial_count = len(df_raben)
-        mask_packaging = df_raben['Material'].astype(str).str.match(r'^P\d{3,4}$', case=False)
-        df_raben = df_raben[~mask_packaging].copy()
-        print(f"Filtr obalů (P...): Odstraněno {initial_count - len(df_raben)} řádků.")
+    if units:
+        check_units(df_sap, [QTY_COLS["sap"]])
+        check_units(df_raben, [QTY_COLS["raben"]])
+    else:
+        df_sap = df_sap.assign(**{QTY_COLS["sap"]: to_units(df_sap[QTY_COLS["sap"]])})
+        df_raben = df_raben.assign(**{QTY_COLS["raben"]: to_units(df_raben[QTY_COLS["raben"]])})
 
-        # B. Přepočet množství pro ZE001906 (* 50)
-        mask_item = df_raben['Material'] == 'ZE001906'
-        count_items = mask_item.sum()
-        if count_items > 0:
-            df_raben.loc[mask_item, 'Mnozstvi_RABEN'] = df_raben.loc[mask_item, 'Mnozstvi_RABEN'] * 50
-            print(f"Přepočet: Upraveno množství u {count_items} řádků (ZE001906).")
+    # --- PRAVIDLA ÚPRAV (vyřazení obalů P***, přepočet ZE001906 ×50, ...) ---
+    df_sap = apply_side_rules(df_sap, "sap", rules)
+    df_raben = apply_side_rules(df_raben, "raben", rules)
 
-        # --- LOGIKA HASH (PRO OBĚ TABULKY) ---
-        print("Generuji HASH sloupce...")
-        df_sap['HASH'] = df_sap.apply(calculate_hash, axis=1)
-        df_raben['HASH'] = df_raben.apply(calculate_hash, axis=1)
+    # --- LOGIKA HASH (PRO OBĚ TABULKY) ---
+    # 64bitový klíč z UPPER(TRIM(Material)) + '|' + UPPER(TRIM(Batch)), viz keys.py
+    log.info("Generuji HASH sloupce...")
+    with stage("merge.keys", rows_in=len(df_sap) + len(df_raben)) as st:
+        df_sap = df_sap.assign(**{KEY_COLUMN: compute_keys(df_sap)})
+        df_raben = df_raben.assign(**{KEY_COLUMN: compute_keys(df_raben)})
+        st["rows_out"] = len(df_sap) + len(df_raben)
 
-        # --- ZÁPIS DO POROVNANI_SKLADU.xlsx ---
-        
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df_sap.to_excel(writer, sheet_name='SAP', index=False)
-            df_raben.to_excel(writer, sheet_name='RABEN', index=False)
-            
-        # --- FORMÁTOVÁNÍ TABULEK ---
-        wb = openpyxl.load_workbook(output_path)
-        
-        # Formátování listu SAP
-        create_excel_table(wb["SAP"], "SAP", "tbl_SAP")
-        
-        # Formátování listu RABEN
-        create_excel_table(wb["RABEN"], "RABEN", "tbl_RABEN")
-        
-        wb.save(output_path)
-        print(f"✅ HOTOVO. Master soubor vytvořen: {output_path}")
+    # --- ZÁPIS DO POROVNANI_SKLADU.xlsx (včetně tabulek) ---
+    # Excel drží čísla jako double, klíč proto ukládáme jako hex
+    if output_path:
+        with stage("merge.write", rows_in=len(df_sap) + len(df_raben)):
+            write_excel_tables(output_path, [
+                ("SAP", with_hex_keys(decimal_quantities(df_sap, [QTY_COLS["sap"]])), "tbl_SAP"),
+                ("RABEN", with_hex_keys(decimal_quantities(df_raben, [QTY_COLS["raben"]])), "tbl_RABEN"),
+            ])
+        log.info(f"✅ HOTOVO. Master soubor vytvořen: {output_path}")
 
+    return df_sap, df_raben
+
+def main():
+    try:
+        df_sap, df_raben = load_inputs()
+        process_merge(df_sap, df_raben, OUTPUT_PATH)
     except Exception as e:
-        print(f"❌ Chyba při slučování: {e}")
+        log.error(f"❌ Chyba při slučování: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    process_merge()
\ No newline at end of file
+    main()
\ No newline at end of file
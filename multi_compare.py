@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import sys
+import pandas as pd
+from keys import KEY_COLUMN, compute_keys
+from rules import SIDES, load_rules, parse_rule_list, apply_rules
+from utils import load_best_sheet, parse_quantity, compact_text, write_excel_tables, column_widths, decimal_quantities
+from sap_processor import process_file
+from compare_processor import STAV_OK, urcit_stav, result_format
+from instrumentation import get_logger, stage
+
+log = get_logger("multi")
+
+# --- KONFIGURACE ---
+# Poskytovatelé (externí sklady): název, soubor, mapování sloupců, SAP lokace, pravidla
+PROVIDERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "providers.json")
+SAP_FILE = "sklady_porovnani/input/SAP.xlsx"
+OUTPUT_FILE = "sklady_porovnani/output/vysledky_poskytovatele.xlsx"
+
+ERP_NAME = "SAP"
+TEXT_COLS = ["Material", "Nazev", "Batch"]
+# Cílový název sloupce množství v column_mapping poskytovatele
+QTY = "Mnozstvi"
+MAPPING_TARGETS = TEXT_COLS + [QTY]
+
+# Celkový STAV (součet všech poskytovatelů proti SAP); po poskytovatelích "<název> manko" jako u RABEN
+STAV_MANKO = "manko"
+STAV_PREBYTEK = "přebytek"
+
+def _check_provider(provider, i, base_dir):
+    """
+    Validace jednoho poskytovatele; chyba nese název (nebo pořadí) poskytovatele.
+    """
+    name = provider.get("name")
+    if not name or not str(name).strip():
+        raise ValueError(f"Poskytovatel č. {i}: chybí 'name'")
+    name = str(name).strip()
+    if name.upper().startswith(ERP_NAME):
+        raise ValueError(f"Poskytovatel '{name}': název nesmí začínat '{ERP_NAME}'")
+
+    mapping = provider.get("column_mapping")
+    if not isinstance(mapping, dict) or not mapping:
+        raise ValueError(f"Poskytovatel '{name}': chybí 'column_mapping'")
+    unknown = set(mapping.values()) - set(MAPPING_TARGETS)
+    if unknown:
+        raise ValueError(f"Poskytovatel '{name}': neznámé cílové sloupce {', '.join(sorted(unknown))} "
+                         f"(povolené: {', '.join(MAPPING_TARGETS)})")
+    missing = [col for col in ("Material", "Batch", QTY) if col not in mapping.values()]
+    if missing:
+        raise ValueError(f"Poskytovatel '{name}': column_mapping nemapuje {', '.join(missing)}")
+
+    rules = provider.get("rules", [])
+    if isinstance(rules, str):
+        # Odkaz na sekci RULES_FILE (např. "raben" = stejná pravidla jako merge krok)
+        if rules not in SIDES:
+            raise ValueError(f"Poskytovatel '{name}': neznámá sekce pravidel '{rules}'")
+        rules = load_rules()[rules]
+    else:
+        rules = parse_rule_list(rules, name)
+
+    path = provider.get("file")
+    return {
+        "name": name,
+        "file": os.path.join(base_dir, path) if path else None,
+        "column_mapping": dict(mapping),
+        "locations": [str(loc) for loc in provider.get("locations", [])],
+        "rules": rules,
+    }
+
+def parse_providers(config, base_dir="."):
+    """
+    Slovník {"providers": [...], "sap_rules": [...]} -> (poskytovatelé, pravidla SAP strany).
+    Lokace (SAP Storage location) mají buď všichni poskytovatelé, nebo nikdo;
+    jedna lokace patří jen jednomu poskytovateli.
+    """
+    providers = [_check_provider(p, i, base_dir) for i, p in enumerate(config.get("providers", []), start=1)]
+    if not providers:
+        raise ValueError("Konfigurace neobsahuje žádného poskytovatele.")
+
+    names = [p["name"] for p in providers]
+    if len(set(names)) != len(names):
+        raise ValueError("Názvy poskytovatelů musí být unikátní.")
+
+    located = [bool(p["locations"]) for p in providers]
+    if any(located) and not all(located):
+        raise ValueError("Lokace (locations) musí mít buď všichni poskytovatelé, nebo žádný.")
+    owners = {}
+    for p in providers:
+        for loc in p["locations"]:
+            if loc in owners:
+                raise ValueError(f"Lokace {loc} je u poskytovatelů {owners[loc]} i {p['name']}")
+            owners[loc] = p["name"]
+
+    sap_rules = config.get("sap_rules", [])
+    if isinstance(sap_rules, str):
+        sap_rules = load_rules()[sap_rules]
+    else:
+        sap_rules = parse_rule_list(sap_rules, ERP_NAME.lower())
+    return providers, sap_rules
+
+def load_providers(path=PROVIDERS_FILE):
+    """
+    Načte konfiguraci poskytovatelů ze souboru JSON (relativní cesty vůči jeho složce).
+    """
+    with open(path, encoding="utf-8") as f:
+        return parse_providers(json.load(f), os.path.dirname(os.path.abspath(path)))
+
+def _apply_rules(df, rules, label):
+    if not rules:
+        return df
+    df, hits = apply_rules(df, rules, QTY)
+    for name, count in hits.items():
+        log.info(f"Pravidlo '{name}' ({label}): {count} řádků.")
+    return df
+
+def process_provider_file(input_path, provider):
+    """
+    Vyčistí export poskytovatele podle jeho column_mapping (stejně jako raben_processor),
+    použije jeho pravidla a doplní klíč. Vrací DataFrame Material, Nazev, Batch, Mnozstvi, HASH.
+    """
+    name = provider["name"]
+    mapping = provider["column_mapping"]
+    log.info(f"--- Zpracovávám {name}: {input_path} ---")
+
+    with stage(f"multi.{name}.load") as st:
+        sheet_name, df = load_best_sheet(input_path, columns=list(mapping), required=list(mapping), dtype=str)
+        st["rows_out"] = len(df)
+
+    df.columns = [str(c).strip() for c in df.columns]
+    missing = [col for col in mapping if col not in df.columns]
+    if missing:
+        raise ValueError(f"{name}: v souboru chybí sloupce: {', '.join(missing)}")
+    df = df.rename(columns=mapping)
+    if "Nazev" not in df.columns:
+        df["Nazev"] = ""
+    df = df[MAPPING_TARGETS]
+
+    with stage(f"multi.{name}.clean", rows_in=len(df)) as st:
+        for col in TEXT_COLS:
+            df[col] = df[col].astype(str).replace('nan', '').str.strip()
+        df = compact_text(df, TEXT_COLS)
+        df[QTY] = parse_quantity(df[QTY], f"{name} {QTY}")
+        df = _apply_rules(df, provider["rules"], name)
+        df = df.assign(**{KEY_COLUMN: compute_keys(df)})
+        st["rows_out"] = len(df)
+    return df
+
+def load_erp(sap_path, providers, sap_rules=()):
+    """
+    SAP se načte jen jednou pro všechny poskytovatele. S lokacemi se filtruje na lokace
+    všech poskytovatelů a každý řádek dostane Poskytovatel podle své lokace;
+    bez lokací platí výchozí filtr sap_processor a Poskytovatel je prázdný.
+    """
+    owners = {loc: p["name"] for p in providers for loc in p["locations"]}
+    df = process_file(sap_path, locations=list(owners) or None, keep_location=True)
+    df = df.rename(columns={"Mnozstvi_SAP": QTY})
+    df = _apply_rules(df, list(sap_rules), ERP_NAME)
+    return df.assign(**{
+        "Poskytovatel": df["Storage location"].astype(str).map(owners).fillna(""),
+        KEY_COLUMN: compute_keys(df),
+    })
+
+def reconcile_many(df_erp, frames, by_location=None):
+    """
+    Vícecestné párování SAP vs všichni poskytovatelé najednou: všechny zdroje se spojí
+    do jedné dlouhé tabulky (klíč, zdroj, množství) a sečtou jedním groupby podle klíče a zdroje.
+    Čas roste lineárně s počtem řádků všech zdrojů, SAP se nepáruje znovu pro každého poskytovatele.
+    frames: {název poskytovatele: DataFrame z process_provider_file}.
+    by_location: SAP je rozdělený na poskytovatele podle lokací (výchozí = podle sloupce Poskytovatel).
+    Po poskytovatelích (jen s rozdělením podle lokací): Mnozstvi_SAP_<P>, Mnozstvi_<P>,
+    Rozdil_<P>, STAV_<P>; vždy celkem Mnozstvi_SAP, Mnozstvi_POSKYTOVATELE, Rozdil, STAV.
+    Množství zůstávají v celých jednotkách. Vrací dvojici (výsledek po klíčích, souhrn).
+    """
+    located = bool((df_erp["Poskytovatel"] != "").any()) if by_location is None else by_location
+    cols = [KEY_COLUMN] + TEXT_COLS + [QTY]
+    erp_source = (ERP_NAME + "_" + df_erp["Poskytovatel"].astype(str)).where(df_erp["Poskytovatel"] != "", ERP_NAME)
+    parts = [df_erp[cols].assign(Zdroj=erp_source)]
+    parts += [df[cols].assign(Zdroj=name) for name, df in frames.items()]
+    long = pd.concat(parts, ignore_index=True)
+
+    log.info(f"Párování {len(frames)} poskytovatelů proti SAP ({len(long)} řádků)...")
+    qty = long.groupby([KEY_COLUMN, "Zdroj"], sort=False)[QTY].sum().unstack("Zdroj", fill_value=0)
+    # Popis z prvního zdroje, který klíč má (SAP má přednost, je v tabulce první)
+    result = long.groupby(KEY_COLUMN, sort=False)[TEXT_COLS].first()
+
+    erp_sources = [f"{ERP_NAME}_{name}" for name in frames] if located else [ERP_NAME]
+    qty = qty.reindex(columns=erp_sources + list(frames), fill_value=0).reindex(result.index, fill_value=0)
+
+    for name in frames:
+        if located:
+            result[f"Mnozstvi_SAP_{name}"] = qty[f"{ERP_NAME}_{name}"]
+        result[f"Mnozstvi_{name}"] = qty[name]
+        if located:
+            result[f"Rozdil_{name}"] = qty[name] - qty[f"{ERP_NAME}_{name}"]
+            result[f"STAV_{name}"] = urcit_stav(result[f"Rozdil_{name}"], f"{name} manko", f"{name} přebytek")
+
+    result["Mnozstvi_SAP"] = qty[erp_sources].sum(axis=1)
+    result["Mnozstvi_POSKYTOVATELE"] = qty[list(frames)].sum(axis=1)
+    result["Rozdil"] = result["Mnozstvi_POSKYTOVATELE"] - result["Mnozstvi_SAP"]
+    result["STAV"] = urcit_stav(result["Rozdil"], STAV_MANKO, STAV_PREBYTEK)
+
+    df_final = result.reset_index()
+    df_final = df_final[[c for c in df_final.columns if c != KEY_COLUMN] + [KEY_COLUMN]]
+    df_final = df_final.sort_values(["Material", "Batch"], kind="mergesort", ignore_index=True)
+    return df_final, summarize_many(df_final, list(frames), located)
+
+def summarize_many(df_final, names, located):
+    """
+    Souhrn po poskytovatelích (jen s lokacemi) a celkem: součty množství a počty klíčů po stavech.
+    """
+    rows = []
+    groups = [(name, f"Mnozstvi_SAP_{name}", f"Mnozstvi_{name}", f"Rozdil_{name}", f"STAV_{name}",
+               (STAV_OK, f"{name} manko", f"{name} přebytek")) for name in names] if located else []
+    groups.append(("Celkem", "Mnozstvi_SAP", "Mnozstvi_POSKYTOVATELE", "Rozdil", "STAV",
+                   (STAV_OK, STAV_MANKO, STAV_PREBYTEK)))
+    for name, sap_col, qty_col, diff_col, stav_col, labels in groups:
+        counts = df_final[stav_col].value_counts()
+        rows.append({
+            "Poskytovatel": name,
+            "Mnozstvi_SAP": df_final[sap_col].sum(),
+            "Mnozstvi": df_final[qty_col].sum(),
+            "Rozdil": df_final[diff_col].sum(),
+            "Pocet_OK": int(counts.get(labels[0], 0)),
+            "Pocet_manko": int(counts.get(labels[1], 0)),
+            "Pocet_prebytek": int(counts.get(labels[2], 0)),
+        })
+    return pd.DataFrame(rows)
+
+def _qty_columns(df):
+    return [c for c in df.columns if c.startswith(("Mnozstvi", "Rozdil"))]
+
+def compare_many(sap_path, providers, provider_paths=None, output_path=None, sap_rules=()):
+    """
+    Celé vícecestné porovnání: SAP jednou, každý poskytovatel jednou, jedno párování.
+    provider_paths: {název: cesta} přepíše 'file' z konfigurace. Report (listy Vysledky
+    a Souhrn) zapisuje jen při zadaném output_path. Vrací výsledný DataFrame.
+    """
+    provider_paths = provider_paths or {}
+    unknown = set(provider_paths) - {p["name"] for p in providers}
+    if unknown:
+        raise ValueError(f"Neznámí poskytovatelé: {', '.join(sorted(unknown))}")
+
+    frames = {}
+    for provider in providers:
+        path = provider_paths.get(provider["name"]) or provider["file"]
+        if not path or not os.path.exists(path):
+            raise FileNotFoundError(f"{provider['name']}: vstupní soubor neexistuje: {path}")
+        frames[provider["name"]] = process_provider_file(path, provider)
+    df_erp = load_erp(sap_path, providers, sap_rules)
+
+    with stage("multi.reconcile", rows_in=len(df_erp) + sum(len(df) for df in frames.values())) as st:
+        df_final, df_summary = reconcile_many(df_erp, frames, by_location=bool(providers[0]["locations"]))
+        st["rows_out"] = len(df_final)
+    log.info(f"Výsledek: {len(df_final)} klíčů Material+Batch")
+    for row in decimal_quantities(df_summary, ["Rozdil"]).itertuples(index=False):
+        log.info(f"   -> {row.Poskytovatel}: OK {row.Pocet_OK}, manko {row.Pocet_manko}, "
+                 f"přebytek {row.Pocet_prebytek}, rozdíl celkem {row.Rozdil}")
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with stage("multi.write", rows_in=len(df_final)):
+            df_out = df_final.drop(columns=KEY_COLUMN)
+            df_out = decimal_quantities(df_out, _qty_columns(df_out))
+            df_summary = decimal_quantities(df_summary, _qty_columns(df_summary))
+            write_excel_tables(output_path, [
+                ("Vysledky", df_out, None, result_format(df_out, labels=(STAV_OK, STAV_MANKO, STAV_PREBYTEK))),
+                ("Souhrn", df_summary, None, {"bold_header": True, "widths": column_widths(df_summary)}),
+            ])
+        log.info("✅ Hotovo. Report vygenerován.")
+    return df_final
+
+def _provider_path(value):
+    name, sep, path = value.partition("=")
+    if not sep or not name or not path:
+        raise argparse.ArgumentTypeError("očekávám NÁZEV=cesta")
+    return name.strip(), path
+
+def main():
+    parser = argparse.ArgumentParser(description="Porovnání SAP proti více poskytovatelům (externím skladům) najednou.")
+    parser.add_argument("--sap", default=SAP_FILE, help="Vstupní SAP export (xlsx/csv/txt)")
+    parser.add_argument("--providers", default=PROVIDERS_FILE, help="Konfigurace poskytovatelů (JSON)")
+    parser.add_argument("--provider", action="append", type=_provider_path, default=[],
+                        help="Soubor poskytovatele jako NÁZEV=cesta (přepíše 'file' z konfigurace), lze opakovat")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Výstupní report (xlsx)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.sap):
+        log.error(f"❌ CHYBA: Soubor '{args.sap}' neexistuje.")
+        sys.exit(1)
+
+    try:
+        providers, sap_rules = load_providers(args.providers)
+        compare_many(args.sap, providers, dict(args.provider), args.output, sap_rules)
+    except Exception as e:
+        log.exception(f"❌ Chyba při porovnání poskytovatelů: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
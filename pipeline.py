@@ -0,0 +1,128 @@
+import argparse
+import os
+import sys
+import excel_cache
+import utils
+import instrumentation
+import sap_processor
+from instrumentation import get_logger
+from ingest import ingest_sources
+from merge_processor import process_merge
+from compare_processor import compare_data, OUTPUT_FORMATS, PREVIEW_FILE
+from delta import SNAPSHOT_FILE
+from history import HISTORY_FILE, cutoff_arg
+from rules import RULES_FILE, load_rules
+
+log = get_logger("pipeline")
+
+# --- KONFIGURACE ---
+INPUT_DIR = "sklady_porovnani/input"
+OUTPUT_DIR = "sklady_porovnani/output"
+
+SAP_FILE = "SAP.xlsx"
+RABEN_FILE = "RABEN.xlsx"
+MERGED_FILE = "POROVNANI_SKLADU.xlsx"
+RESULT_FILE = "vysledky.xlsx"
+# Běhový report (JSON lines, řádek na krok), připisuje se do výstupní složky
+RUN_REPORT_FILE = "behy.jsonl"
+
+def run_pipeline(sap_path, raben_path, output_dir=OUTPUT_DIR, write_intermediate=False, merged_path=None,
+                 snapshot_path=None, delta=False, rules=None, concurrent=None, output_format="xlsx",
+                 history_path=None, cutoff=None, preview=None, full_report=True):
+    """
+    Celé porovnání v jednom procesu: SAP -> RABEN -> merge -> compare.
+    Data tečou mezi kroky jako DataFrame v paměti. Mezivýstupy (SAP.xlsx, RABEN.xlsx,
+    POROVNANI_SKLADU.xlsx) se zapisují jen při write_intermediate=True, report vysledky.xlsx vždy
+    (pokud není full_report=False).
+    snapshot_path/delta/history_path/cutoff viz compare_data, rules viz process_merge,
+    concurrent viz ingest_sources (SAP a RABEN se načítají souběžně ve dvou procesech),
+    output_format viz write_report.
+    preview=N zapíše hned po párování náhled nahled.xlsx (viz compare_data); full_report=False
+    vynechá celý report (např. když stačí náhled).
+    Vrací výsledný DataFrame.
+    """
+    utils.check_data_format(output_format)
+    os.makedirs(output_dir, exist_ok=True)
+
+    sap_out = os.path.join(output_dir, SAP_FILE) if write_intermediate else None
+    raben_out = os.path.join(output_dir, RABEN_FILE) if write_intermediate else None
+    merged_out = None
+    if write_intermediate:
+        merged_out = merged_path or os.path.join(output_dir, MERGED_FILE)
+
+    df_sap, df_raben = ingest_sources(sap_path, raben_path, sap_out, raben_out, concurrent=concurrent)
+    # Procesory vrací množství v celých jednotkách (výchozí units=True v merge i compare)
+    df_sap, df_raben = process_merge(df_sap, df_raben, merged_out, rules=rules)
+    return compare_data(df_sap, df_raben, os.path.join(output_dir, RESULT_FILE) if full_report else None,
+                        snapshot_path=snapshot_path, delta=delta, output_format=output_format,
+                        history_path=history_path, cutoff=cutoff,
+                        preview=preview, preview_path=os.path.join(output_dir, os.path.basename(PREVIEW_FILE)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Porovnání skladů SAP vs RABEN v jednom běhu.")
+    parser.add_argument("--sap", default=os.path.join(INPUT_DIR, SAP_FILE), help="Vstupní SAP export (xlsx)")
+    parser.add_argument("--raben", default=os.path.join(INPUT_DIR, RABEN_FILE), help="Vstupní RABEN export (xlsx)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Složka pro výstupy")
+    parser.add_argument("--intermediate", action="store_true",
+                        help="Zapsat i mezivýstupy SAP.xlsx, RABEN.xlsx a POROVNANI_SKLADU.xlsx")
+    parser.add_argument("--delta", action="store_true",
+                        help="Přidat list Zmeny se změnami proti předchozímu běhu")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Nepoužít cache naparsovaných vstupů (vždy číst Excel znovu)")
+    parser.add_argument("--reader", choices=utils.EXCEL_READERS, default=utils.EXCEL_READER,
+                        help="Čtení Excelu: stream (openpyxl read_only) nebo pandas (pd.read_excel)")
+    parser.add_argument("--encoding", default=sap_processor.FLAT_FILE_ENCODING,
+                        help="Kódování textového SAP exportu (CSV/TXT), např. cp1250")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="xlsx",
+                        help="Formát výsledků; mimo xlsx vznikne datový soubor a souhrnný sešit vysledky.xlsx")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Načíst SAP a RABEN postupně v jednom procesu (bez souběžného načtení)")
+    parser.add_argument("--cutoff", type=cutoff_arg,
+                        help="Datum stavu skladu pro historii (YYYY-MM-DD, výchozí dnešek)")
+    parser.add_argument("--preview", type=int, metavar="N",
+                        help="Hned po párování vypsat N největších rozdílů a uložit je do nahled.xlsx")
+    parser.add_argument("--no-report", action="store_true", help="Nezapisovat celý report vysledky.xlsx")
+    parser.add_argument("--rules", default=RULES_FILE, help="Pravidla úprav dat pro merge krok (JSON)")
+    parser.add_argument("--log-level", default=instrumentation.LOG_LEVEL,
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper,
+                        help="Úroveň výpisů (DEBUG vypíše i metriky každého kroku)")
+    parser.add_argument("--report", help=f"Běhový report JSON lines (výchozí <output-dir>/{RUN_REPORT_FILE})")
+    parser.add_argument("--profile-dir", help="Uložit cProfile výpis každého kroku do této složky")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Měřit špičku alokací každého kroku přes tracemalloc (pomalejší)")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        excel_cache.CACHE_ENABLED = False
+    utils.EXCEL_READER = args.reader
+    sap_processor.FLAT_FILE_ENCODING = args.encoding
+    instrumentation.set_level(args.log_level)
+    if args.profile_dir:
+        instrumentation.PROFILE_DIR = args.profile_dir
+    if args.trace_memory:
+        instrumentation.TRACE_MEMORY = True
+    report_path = args.report or os.path.join(args.output_dir, RUN_REPORT_FILE)
+    run_id = instrumentation.start_run(report_path)
+
+    for path in (args.sap, args.raben):
+        if not os.path.exists(path):
+            log.error(f"❌ CHYBA: Soubor '{path}' neexistuje.")
+            sys.exit(1)
+
+    try:
+        # Master soubor zůstává tam, kde ho čekají samostatné skripty (input složka)
+        run_pipeline(args.sap, args.raben, args.output_dir, args.intermediate,
+                     merged_path=os.path.join(INPUT_DIR, MERGED_FILE),
+                     snapshot_path=os.path.join(args.output_dir, os.path.basename(SNAPSHOT_FILE)),
+                     delta=args.delta, rules=load_rules(args.rules),
+                     concurrent=False if args.sequential else None, output_format=args.format,
+                     history_path=os.path.join(args.output_dir, os.path.basename(HISTORY_FILE)),
+                     cutoff=args.cutoff, preview=args.preview, full_report=not args.no_report)
+    except Exception as e:
+        log.exception(f"❌ Chyba při zpracování: {e}")
+        sys.exit(1)
+    finally:
+        log.info(f"   -> Report běhu {run_id}: {report_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# --- KONFIGURACE ---
+# Pravidla úprav dat v merge kroku (JSON, viz merge_rules.json)
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "merge_rules.json")
+
+RULE_TYPES = ("exclude", "keep", "multiply", "rename")
+SIDES = ("sap", "raben")
+
+def _check_rule(rule, side, i):
+    """
+    Validace jednoho pravidla; chyba nese název (nebo pořadí) pravidla.
+    """
+    name = rule.get("name") or f"{side}[{i}]"
+    kind = rule.get("type")
+    if kind not in RULE_TYPES:
+        raise ValueError(f"Pravidlo '{name}': neznámý typ '{kind}' (povolené: {', '.join(RULE_TYPES)})")
+    if kind == "rename":
+        if not isinstance(rule.get("mapping"), dict) or not rule["mapping"]:
+            raise ValueError(f"Pravidlo '{name}': rename potřebuje neprázdné 'mapping'")
+    elif ("pattern" in rule) == ("values" in rule):
+        raise ValueError(f"Pravidlo '{name}': zadejte právě jedno z 'pattern' nebo 'values'")
+    if "pattern" in rule:
+        try:
+            re.compile(rule["pattern"])
+        except re.error as e:
+            raise ValueError(f"Pravidlo '{name}': neplatný regex ({e})")
+    if kind == "multiply" and not isinstance(rule.get("factor"), (int, float)):
+        raise ValueError(f"Pravidlo '{name}': multiply potřebuje číselný 'factor'")
+    return dict(rule, name=name, column=rule.get("column", "Material"))
+
+def parse_rules(config):
+    """
+    Slovník {"sap": [...], "raben": [...]} -> zvalidovaná pravidla po stranách.
+    """
+    unknown = set(config) - set(SIDES)
+    if unknown:
+        raise ValueError(f"Neznámé sekce pravidel: {', '.join(sorted(unknown))}")
+    return {side: parse_rule_list(config.get(side, []), side) for side in SIDES}
+
+def parse_rule_list(rules, side):
+    """
+    Zvalidovaný seznam pravidel jedné strany (side se použije v názvu nepojmenovaných pravidel).
+    """
+    return [_check_rule(rule, side, i) for i, rule in enumerate(rules, start=1)]
+
+def load_rules(path=RULES_FILE):
+    """
+    Načte pravidla ze souboru JSON.
+    """
+    with open(path, encoding="utf-8") as f:
+        return parse_rules(json.load(f))
+
+def _match_values(values, rule):
+    text = values.astype(str)
+    if "pattern" in rule:
+        hit = text.str.match(rule["pattern"], case=not rule.get("ignore_case", False))
+    else:
+        hit = text.isin([str(v) for v in rule["values"]])
+    return hit.fillna(False).to_numpy(dtype=bool)
+
+def rule_mask(series, rule):
+    """
+    Vektorová maska řádků, na které pravidlo míří.
+    U category sloupce se testují jen unikátní hodnoty (kategorie), řádky dostanou výsledek přes kódy.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        hit = _match_values(series.cat.categories.to_series(), rule)
+        # Kód -1 (chybějící hodnota) ukáže na přidané False
+        return np.append(hit, False)[series.cat.codes.to_numpy()]
+    return _match_values(series, rule)
+
+def _rename(series, mapping, mask):
+    """
+    Přejmenování hodnot podle mapping (klíče jako text). U category se mění jen kategorie
+    (duplicity po přejmenování se sloučí přes factorize), řádky se nepřepisují.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories.to_series()
+        text = categories.astype(str)
+        renamed = categories.where(~text.isin(list(mapping)), text.map(mapping))
+        codes_map, uniques = pd.factorize(renamed)
+        codes = series.cat.codes.to_numpy()
+        new_codes = np.where(codes >= 0, codes_map[codes], -1)
+        return pd.Series(pd.Categorical.from_codes(new_codes, categories=uniques), index=series.index)
+    return series.where(~mask, series.astype(str).map(mapping))
+
+def apply_rules(df, rules, qty_col):
+    """
+    Použije pravidla jedné strany v jednom průchodu. Všechny masky se počítají nad původními
+    hodnotami (pořadí pravidel tedy nehraje roli), faktory multiply se násobí do jednoho vektoru,
+    přejmenování jednoho sloupce se slučují (u stejné hodnoty vyhrává první pravidlo)
+    a řádky se filtrují jen jednou na konci - bez mezikopií tabulky.
+    Vrací (DataFrame, {název pravidla: počet zasažených řádků}).
+    U multiply/rename se počítají jen řádky, které nevyřadilo exclude/keep.
+    """
+    if not rules:
+        return df, {}
+
+    masks = []
+    for rule in rules:
+        column = rule["column"]
+        if column not in df.columns:
+            raise ValueError(f"Pravidlo '{rule['name']}': sloupec '{column}' v datech není")
+        if rule["type"] == "rename":
+            masks.append(rule_mask(df[column], {"values": list(rule["mapping"])}))
+        else:
+            masks.append(rule_mask(df[column], rule))
+
+    drop = np.zeros(len(df), dtype=bool)
+    for rule, mask in zip(rules, masks):
+        if rule["type"] == "exclude":
+            drop |= mask
+        elif rule["type"] == "keep":
+            drop |= ~mask
+    keep = ~drop
+
+    hits = {}
+    factor = None
+    # Celočíselné faktory násobí celočíselně (množství v jednotkách zůstanou přesná)
+    int_factors = all(isinstance(r["factor"], int) for r in rules if r["type"] == "multiply")
+    renames = {}
+    for rule, mask in zip(rules, masks):
+        if rule["type"] == "exclude":
+            hits[rule["name"]] = int(mask.sum())
+        elif rule["type"] == "keep":
+            hits[rule["name"]] = int((~mask).sum())
+        elif rule["type"] == "multiply":
+            mask = mask & keep
+            hits[rule["name"]] = int(mask.sum())
+            if factor is None:
+                factor = np.ones(len(df), dtype=np.int64 if int_factors else float)
+            factor[mask] *= rule["factor"]
+        else:
+            mask = mask & keep
+            hits[rule["name"]] = int(mask.sum())
+            mapping, column_mask = renames.get(rule["column"], ({}, np.zeros(len(df), dtype=bool)))
+            mapping = {**{str(k): v for k, v in rule["mapping"].items()}, **mapping}
+            renames[rule["column"]] = (mapping, column_mask | mask)
+
+    updates = {column: _rename(df[column], mapping, mask) for column, (mapping, mask) in renames.items()}
+    if factor is not None:
+        qty = df[qty_col] * factor
+        if pd.api.types.is_integer_dtype(df[qty_col]) and not int_factors:
+            # Množství v celých jednotkách (utils.to_units) zůstává celočíselné
+            qty = qty.round().astype(np.int64)
+        updates[qty_col] = qty
+    if updates:
+        df = df.assign(**updates)
+    if drop.any():
+        df = df[keep]
+    return df, hits
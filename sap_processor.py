@@ -1,8 +1,13 @@
 import pandas as pd
+import csv
 import sys
 import os
 # Import vlastních funkcí
-from utils import find_best_sheet, create_excel_table
+from utils import (load_best_sheet, write_excel_tables, parse_quantity, parse_quantity_report,
+                   report_invalid_quantities, compact_text, to_units, decimal_quantities)
+from instrumentation import get_logger, stage
+
+log = get_logger("sap")
 
 # --- KONFIGURACE ---
 REQUIRED_COLS = {
@@ -17,6 +22,18 @@ OPTIONAL_COLS = {
     "plant": "Plant"
 }
 
+ALLOWED_LOCATIONS = ["F010", "F070"]
+ORDERED_COLS = ["Material", "Material description", "Batch", "Total Quantity"]
+RENAME_MAP = {"Material description": "Nazev", "Total Quantity": "Mnozstvi_SAP"}
+# Opakující se texty drží výstup jako category
+TEXT_COLS = ["Material", "Nazev", "Batch"]
+
+# Textové exporty (SE16/MB52) se čtou proudově po blocích
+FLAT_FILE_EXTENSIONS = (".csv", ".txt", ".tsv")
+# Kódování textových exportů; SE16/MB52 z Windows SAP GUI bývá cp1250 (SKLADY_FLAT_FILE_ENCODING, --encoding)
+FLAT_FILE_ENCODING = os.environ.get("SKLADY_FLAT_FILE_ENCODING", "utf-8-sig")
+CHUNK_SIZE = 100_000
+
 def normalize_columns(df):
     """
     Přejmenuje sloupce v DataFrame na standardní formát (dle zadání).
@@ -40,62 +57,141 @@ def normalize_columns(df):
         
     return df.rename(columns=mapping)
 
-def process_file(input_path, output_path):
-    print(f"--- Zpracovávám soubor: {input_path} ---")
-    
+def output_columns(keep_location=False):
+    return ORDERED_COLS + (["Storage location"] if keep_location else [])
+
+def filter_locations(df, locations=None, keep_location=False):
+    """
+    Normalizace, filtr Storage location (výchozí ALLOWED_LOCATIONS), ořez na potřebné sloupce a přejmenování.
+    keep_location=True ponechá i sloupec Storage location (rozpad SAP na více skladů, viz multi_compare).
+    Funguje na celé tabulce i na jednotlivých blocích proudového čtení.
+    """
+    # Normalizace
+    df = normalize_columns(df)
+
+    # Filtr Storage location
+    df = df[df["Storage location"].astype(str).isin(ALLOWED_LOCATIONS if locations is None else locations)]
+
+    # Smazání sloupců (Storage location, Plant, ostatní) a uspořádání na 4 sloupce
+    df = df[output_columns(keep_location)]
+
+    # Přejmenování
+    return df.rename(columns=RENAME_MAP)
+
+def finalize(df, top_label=None):
+    """
+    Sort podle Mnozstvi_SAP sestupně a smazání prvního datového řádku po sortu.
+    top_label: index řádku s největším množstvím, pokud je už známý (proudové čtení).
+    """
+    # Smazat první datový řádek po sortu = první výskyt maxima (mergesort je stabilní)
+    if len(df) > 0:
+        if top_label is None:
+            top_label = df["Mnozstvi_SAP"].idxmax()
+        df = df.drop(index=top_label)
+
+    # Sort
+    return df.sort_values(by="Mnozstvi_SAP", ascending=False, kind='mergesort')
+
+def sniff_delimiter(input_path, encoding=None):
+    """
+    Oddělovač textového exportu (středník, čárka, tabulátor, svislítko) podle hlavičky.
+    """
+    with open(input_path, encoding=encoding or FLAT_FILE_ENCODING, newline="") as f:
+        header = f.readline()
     try:
-        # 1. Autodetekce listu (z utils)
-        sheet_name = find_best_sheet(input_path)
-        df = pd.read_excel(input_path, sheet_name=sheet_name)
-        
-        # 2. Normalizace
-        df = normalize_columns(df)
-        
-        # 3. Filtr Storage location
-        allowed_locations = ["F010", "F070"]
-        df = df[df["Storage location"].astype(str).isin(allowed_locations)].copy()
-        
-        # 4. Smazání sloupců
-        cols_to_drop = ["Storage location"]
-        if "Plant" in df.columns:
-            cols_to_drop.append("Plant")
-        df = df.drop(columns=cols_to_drop, errors='ignore')
-        
-        # 5. Uspořádání
-        ordered_cols = ["Material", "Material description", "Batch", "Total Quantity"]
-        remaining_cols = [c for c in df.columns if c not in ordered_cols]
-        df = df[ordered_cols + remaining_cols]
-        
-        # 6. Přejmenování
-        rename_map = {"Material description": "Nazev", "Total Quantity": "Mnozstvi_SAP"}
-        df = df.rename(columns=rename_map)
-        
-        # 7. Sort
-        df["Mnozstvi_SAP"] = pd.to_numeric(df["Mnozstvi_SAP"], errors='coerce').fillna(0)
-        df = df.sort_values(by="Mnozstvi_SAP", ascending=False, kind='mergesort')
-        
-        # 8. Smazat první datový řádek po sortu
-        if len(df) > 0:
-            df = df.iloc[1:]
-        
-        # 9. Ořezat na 4 sloupce
-        df = df.iloc[:, :4]
-        
-        # --- EXPORT DAT (Pandas) ---
-        # Použijeme openpyxl engine pro kompatibilitu
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='SAP', index=False)
-            
-        # --- FORMÁTOVÁNÍ TABULKY (z utils) ---
-        create_excel_table(output_path, 'SAP', 'tbl_SAP')
-        
-        print(f"✅ Hotovo. Uloženo do: {output_path}")
+        return csv.Sniffer().sniff(header, delimiters=";,\t|").delimiter
+    except csv.Error:
+        raise ValueError(f"Nelze určit oddělovač sloupců v souboru {input_path}")
 
-    except Exception as e:
-        print(f"❌ Chyba při zpracování: {e}")
-        sys.exit(1)
+def read_flat_file(input_path, chunk_size=None, encoding=None, locations=None, keep_location=False):
+    """
+    Proudové čtení textového SAP exportu (CSV/TXT z SE16/MB52) po blocích.
+    Na každý blok se hned použije filter_locations, v paměti zůstávají jen vyhovující řádky.
+    Řádek s největším množstvím se sleduje průběžně, bez sortu celé tabulky.
+    chunk_size/encoding: výchozí CHUNK_SIZE/FLAT_FILE_ENCODING v okamžiku volání (lze změnit z CLI).
+    Vrací dvojici (DataFrame, index řádku s největším množstvím).
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    encoding = encoding or FLAT_FILE_ENCODING
+    sep = sniff_delimiter(input_path, encoding)
+    wanted = set(REQUIRED_COLS) | set(OPTIONAL_COLS)
+    reader = pd.read_csv(input_path, sep=sep, dtype=str, encoding=encoding, chunksize=chunk_size,
+                         usecols=lambda c: str(c).strip().lower() in wanted)
 
-if __name__ == "__main__":
+    parts = []
+    invalid = []
+    total_rows = 0
+    top_label = None
+    top_value = None
+    for chunk in reader:
+        total_rows += len(chunk)
+        part = filter_locations(chunk, locations, keep_location)
+        if part.empty:
+            continue
+
+        values, bad = parse_quantity_report(part["Mnozstvi_SAP"])
+        values = to_units(values)
+        part = part.assign(Mnozstvi_SAP=values)
+        invalid.append(bad)
+
+        # Index je přes bloky souvislý; ostrá nerovnost drží první výskyt maxima
+        label = values.idxmax()
+        if top_value is None or values[label] > top_value:
+            top_label, top_value = label, values[label]
+        parts.append(part)
+
+    if invalid:
+        report_invalid_quantities(pd.concat(invalid), "Mnozstvi_SAP")
+
+    if parts:
+        df = pd.concat(parts)
+    else:
+        df = pd.DataFrame(columns=[RENAME_MAP.get(c, c) for c in output_columns(keep_location)])
+    log.info(f"   -> Načteno {total_rows} řádků, po filtru lokací {len(df)}")
+    return df, top_label
+
+def process_file(input_path, output_path=None, locations=None, keep_location=False, encoding=None):
+    """
+    Vyčistí SAP export a vrátí výsledný DataFrame.
+    Excel (xlsx) se čte celý, textové exporty (CSV/TXT) proudově po blocích.
+    Do Excelu (list SAP, tabulka tbl_SAP) zapisuje jen při zadaném output_path.
+    locations/keep_location viz filter_locations, encoding viz read_flat_file (jen textové exporty).
+    Chyby propagují výjimkou, ukončení procesu řeší až CLI.
+    """
+    log.info(f"--- Zpracovávám soubor: {input_path} ---")
+
+    if input_path.lower().endswith(FLAT_FILE_EXTENSIONS):
+        with stage("sap.load") as st:
+            df, top_label = read_flat_file(input_path, encoding=encoding, locations=locations,
+                                           keep_location=keep_location)
+            st["rows_out"] = len(df)
+    else:
+        # Autodetekce listu (z utils), čteme jen sloupce, které zpracování používá
+        with stage("sap.load") as st:
+            sheet_name, df = load_best_sheet(input_path, columns=list(REQUIRED_COLS) + list(OPTIONAL_COLS),
+                                             required=list(REQUIRED_COLS.values()))
+            st["rows_out"] = len(df)
+        with stage("sap.filter", rows_in=len(df)) as st:
+            df = filter_locations(df, locations, keep_location)
+            st["rows_out"] = len(df)
+        with stage("sap.parse_quantity", rows_in=len(df)) as st:
+            df = df.assign(Mnozstvi_SAP=parse_quantity(df["Mnozstvi_SAP"], "Mnozstvi_SAP"))
+            st["rows_out"] = len(df)
+        top_label = None
+
+    with stage("sap.finalize", rows_in=len(df)) as st:
+        df = finalize(compact_text(df, TEXT_COLS), top_label)
+        st["rows_out"] = len(df)
+
+    # --- EXPORT DAT + FORMÁTOVÁNÍ TABULKY (z utils) ---
+    if output_path:
+        with stage("sap.write", rows_in=len(df)):
+            write_excel_tables(output_path, [('SAP', decimal_quantities(df, ["Mnozstvi_SAP"]), 'tbl_SAP')])
+        log.info(f"✅ Hotovo. Uloženo do: {output_path}")
+
+    return df
+
+def main():
     input_dir = "sklady_porovnani/input"
     output_dir = "sklady_porovnani/output"
     filename = "SAP.xlsx"
@@ -105,8 +201,23 @@ if __name__ == "__main__":
     
     os.makedirs(output_dir, exist_ok=True)
 
+    # Bez SAP.xlsx zkusíme textový export (SAP.csv / SAP.txt / SAP.tsv)
     if not os.path.exists(infile):
-        print(f"❌ CHYBA: Soubor '{infile}' neexistuje.")
+        base = os.path.splitext(infile)[0]
+        for ext in FLAT_FILE_EXTENSIONS:
+            if os.path.exists(base + ext):
+                infile = base + ext
+                break
+
+    if not os.path.exists(infile):
+        log.error(f"❌ CHYBA: Soubor '{infile}' neexistuje.")
+        sys.exit(1)
+
+    try:
+        process_file(infile, outfile)
+    except Exception as e:
+        log.error(f"❌ Chyba při zpracování: {e}")
         sys.exit(1)
 
-    process_file(infile, outfile)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,138 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from utils import write_excel_tables
+from instrumentation import get_logger
+
+log = get_logger("synthetic")
+
+# --- KONFIGURACE ---
+# Rozložení skladových lokací v SAP exportu (jen F010/F070 projdou filtrem)
+LOCATIONS = ["F010", "F070", "F020", "F050", "X999"]
+LOCATION_WEIGHTS = [0.35, 0.25, 0.2, 0.1, 0.1]
+
+RABEN_HEADER = ["1-Císlo zboží", "3-název", "4-ks", "64-Úroveo sledování", "12-šarže", "5-kart", "4-ks", "", ""]
+
+def czech_number(values, rng):
+    """
+    Čísla jako text v různých českých formátech: "1 500,50", "1.500,50", NBSP oddělovač, "3,00".
+    """
+    out = []
+    styles = rng.integers(0, 4, size=len(values))
+    for value, style in zip(values, styles):
+        text = f"{value:,.2f}"  # 1,500.50
+        if style == 0:
+            out.append(text.replace(",", " ").replace(".", ","))
+        elif style == 1:
+            out.append(text.replace(",", "#").replace(".", ",").replace("#", "."))
+        elif style == 2:
+            out.append(text.replace(",", "\xa0").replace(".", ","))
+        else:
+            out.append(f"{value:.2f}".replace(".", ","))
+    return out
+
+def generate_sap(n_rows, seed=0):
+    """
+    Syntetický SAP export: smíšené lokace, duplicitní materiály, ZE001906, sloupce navíc.
+    """
+    rng = np.random.default_rng(seed)
+    n_materials = max(n_rows // 3, 1)
+    materials = np.array([f"{i:07d}" for i in rng.choice(10_000_000, size=n_materials, replace=False)])
+    material = materials[rng.integers(0, n_materials, size=n_rows)]
+    material[rng.random(n_rows) < 0.01] = "ZE001906"
+
+    quantity = rng.integers(1, 500, size=n_rows).astype(float)
+    decimals = rng.random(n_rows) < 0.1
+    quantity[decimals] = np.round(quantity[decimals] + rng.random(decimals.sum()), 2)
+
+    return pd.DataFrame({
+        "Plant": "3F13",
+        "Storage location": rng.choice(LOCATIONS, size=n_rows, p=LOCATION_WEIGHTS),
+        "Material": material,
+        "sds": None,
+        "cc": None,
+        "Material description": np.char.add("POPIS ", material.astype(str)),
+        "Batch": np.char.add("B", rng.integers(0, 10 * n_rows, size=n_rows).astype(str)),
+        "dsd": None,
+        "Total Quantity": quantity,
+    })
+
+def generate_raben(df_sap, seed=0):
+    """
+    Syntetický RABEN export odvozený od SAP (aby se klíče párovaly): odchylky množství,
+    šarže rozdělené na více palet, obaly P***, ZE001906 v jednotkách /50, nové položky.
+    """
+    rng = np.random.default_rng(seed + 1)
+    sap = df_sap[df_sap["Storage location"].isin(["F010", "F070"])]
+    sap = sap[rng.random(len(sap)) < 0.95]
+
+    quantity = sap["Total Quantity"].to_numpy().copy()
+    changed = rng.random(len(quantity)) < 0.1
+    quantity[changed] += rng.integers(-5, 6, size=changed.sum())
+    ze = (sap["Material"] == "ZE001906").to_numpy()
+    quantity[ze] = np.round(quantity[ze] / 50, 2)
+
+    rows = pd.DataFrame({
+        "Material": sap["Material"].to_numpy(),
+        "Nazev": sap["Material description"].to_numpy(),
+        "Batch": sap["Batch"].to_numpy(),
+        "Mnozstvi": quantity,
+    })
+
+    # Šarže rozdělené na dvě palety (duplicitní Material+Batch)
+    split = rows[rng.random(len(rows)) < 0.05].copy()
+    half = np.floor(split["Mnozstvi"] / 2)
+    rows.loc[split.index, "Mnozstvi"] -= half
+    split["Mnozstvi"] = half
+
+    n_extra = max(len(rows) // 20, 1)
+    packaging = pd.DataFrame({
+        "Material": [f"P{n:03d}" for n in rng.integers(100, 10_000, size=n_extra)],
+        "Nazev": "PALETA",
+        "Batch": "",
+        "Mnozstvi": rng.integers(1, 50, size=n_extra).astype(float),
+    })
+    new_items = pd.DataFrame({
+        "Material": [f"N{n:06d}" for n in rng.integers(0, 1_000_000, size=n_extra)],
+        "Nazev": "NOVA POLOZKA",
+        "Batch": [f"NB{n}" for n in range(n_extra)],
+        "Mnozstvi": rng.integers(1, 50, size=n_extra).astype(float),
+    })
+    rows = pd.concat([rows, split, packaging, new_items], ignore_index=True)
+    rows = rows.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+    qty_text = czech_number(rows["Mnozstvi"].to_numpy(), rng)
+    data = [rows["Material"], rows["Nazev"], qty_text, "BOX", rows["Batch"], qty_text, qty_text, "", ""]
+    df = pd.DataFrame({i: col for i, col in enumerate(data)})
+    df.columns = RABEN_HEADER
+    return df
+
+def write_sources(output_dir, n_rows, seed=0):
+    """
+    Zapíše SAP.xlsx a RABEN.xlsx (každý s malým listem navíc kvůli autodetekci listu).
+    Vrací dvojici cest.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    df_sap = generate_sap(n_rows, seed)
+    df_raben = generate_raben(df_sap, seed)
+    info = pd.DataFrame({"Parametr": ["rows", "seed"], "Hodnota": [n_rows, seed]})
+
+    sap_path = os.path.join(output_dir, "SAP.xlsx")
+    raben_path = os.path.join(output_dir, "RABEN.xlsx")
+    write_excel_tables(sap_path, [("Info", info, None), ("Sheet1", df_sap, None)])
+    write_excel_tables(raben_path, [("Info", info, None), ("cz_stock_function", df_raben, None)])
+    return sap_path, raben_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Generátor syntetických vstupů SAP.xlsx a RABEN.xlsx.")
+    parser.add_argument("--rows", type=int, default=10_000, help="Počet řádků SAP exportu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="sklady_porovnani/synthetic")
+    args = parser.parse_args()
+
+    sap_path, raben_path = write_sources(args.output_dir, args.rows, args.seed)
+    log.info(f"✅ Vygenerováno: {sap_path}, {raben_path}")
+
+if __name__ == "__main__":
+    main()
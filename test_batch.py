@@ -0,0 +1,49 @@
+import unittest
+import pandas as pd
+import os
+import shutil
+from batch import discover_pairs, run_batch
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = "test_batch_temp"
+        sap = pd.DataFrame({
+            "Material": ["M1", "M2", "TOP"],
+            "Material description": ["A", "B", "Top"],
+            "Batch": ["B1", "B2", "T1"],
+            "Total Quantity": [10, 5, 1000],
+            "Storage location": ["F010", "F070", "F010"],
+        })
+        raben = pd.DataFrame({
+            "1-Císlo zboží": ["M1", "M2"],
+            "3-název": ["A", "B"],
+            "4-ks": ["10,00", "2,00"],
+            "12-šarže": ["B1", "B2"],
+        })
+        for name in ("sklad_a", "sklad_b", "vadny"):
+            os.makedirs(os.path.join(self.work_dir, "in", name))
+            sap.to_excel(os.path.join(self.work_dir, "in", name, "SAP.xlsx"), index=False)
+        for name in ("sklad_a", "sklad_b"):
+            raben.to_excel(os.path.join(self.work_dir, "in", name, "RABEN.xlsx"), index=False)
+        # RABEN bez očekávaných sloupců
+        sap.to_excel(os.path.join(self.work_dir, "in", "vadny", "RABEN.xlsx"), index=False)
+
+    def test_run_batch(self):
+        pairs = discover_pairs(os.path.join(self.work_dir, "in"))
+        self.assertEqual(len(pairs), 3)
+
+        output_root = os.path.join(self.work_dir, "out")
+        df_index = run_batch(pairs, output_root, workers=2).set_index("name")
+
+        self.assertEqual(df_index.loc["sklad_a", "stav"], "OK")
+        self.assertEqual(df_index.loc["sklad_b", "klicu"], 2)
+        self.assertEqual(df_index.loc["vadny", "stav"], "CHYBA", "Vadná dvojice nemá shodit celou dávku.")
+        self.assertTrue(os.path.exists(os.path.join(output_root, "sklad_a", "vysledky.xlsx")))
+        self.assertTrue(os.path.exists(os.path.join(output_root, "index.xlsx")))
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import json
+import shutil
+import excel_cache
+from synthetic_data import write_sources
+from benchmark import run_benchmark, find_regressions, BASELINE_FILE
+from pipeline import run_pipeline
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = "test_benchmark_temp"
+
+    def test_synthetic_sources_run_through_pipeline(self):
+        sap_path, raben_path = write_sources(self.work_dir, 300, seed=1)
+        df = run_pipeline(sap_path, raben_path, os.path.join(self.work_dir, "out"))
+
+        self.assertGreater(len(df), 0)
+        # Obaly P*** merge vyřadí, ZE001906 se po přepočtu ×50 páruje
+        self.assertFalse(df["Material"].str.match(r"^P\d{3}").any())
+        self.assertEqual(set(df["STAV"].unique()), {"STAV OK", "RABEN manko", "RABEN přebytek"})
+
+    def test_regressions(self):
+        # Benchmark má měřit skutečné načtení Excelu, ne cache (a cache nemá plnit)
+        cache_dir = excel_cache.CACHE_DIR
+        excel_cache.CACHE_DIR = os.path.join(self.work_dir, "cache")
+        try:
+            baseline = run_benchmark([200])
+        finally:
+            excel_cache.CACHE_DIR = cache_dir
+        self.assertFalse(os.path.exists(os.path.join(self.work_dir, "cache")))
+        self.assertEqual(excel_cache.CACHE_ENABLED, not os.environ.get("SKLADY_NO_CACHE"))
+        self.assertIn("write_report", baseline["vysledky"]["200"])
+        self.assertEqual(find_regressions(baseline, baseline), [])
+
+        slower = {"vysledky": {"200": {"reconcile": {"sekundy": 10.0, "pamet_mb": 0.0}}}}
+        base = {"vysledky": {"200": {"reconcile": {"sekundy": 1.0, "pamet_mb": 0.0}}}}
+        self.assertEqual(len(find_regressions(slower, base)), 1)
+        self.assertEqual(find_regressions(base, slower), [])
+
+    def test_committed_baseline(self):
+        # Referenční baseline v repozitáři pokrývá velikosti z meta a všechny měřené kroky
+        with open(BASELINE_FILE, encoding="utf-8") as f:
+            baseline = json.load(f)
+        self.assertListEqual(list(baseline["vysledky"]), [str(size) for size in baseline["meta"]["velikosti"]])
+        for stages in baseline["vysledky"].values():
+            self.assertIn("write_report", stages)
+
+    def tearDown(self):
+        if os.path.exists(self.work_dir):
+            shutil.rmtree(self.work_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+import pandas as pd
+import openpyxl
+import os
+from keys import KEY_COLUMN, compute_keys
+from compare_processor import reconcile, compare_data, write_report, top_differences
+from delta import compute_delta, save_snapshot, load_snapshot
+from utils import to_units, from_units, QUANTITY_SCALE
+
+class TestCompareProcessor(unittest.TestCase):
+
+    def setUp(self):
+        self.df_sap = pd.DataFrame({
+            "Material": ["M1", "M2", "M3"],
+            "Nazev": ["A", "B", "C"],
+            "Batch": ["B1", "B2", "B3"],
+            "Mnozstvi_SAP": [10.0, 5.0, 1.0],
+        })
+        # Šarže M1/B1 rozdělená na tři palety
+        self.df_raben = pd.DataFrame({
+            "Material": ["M1", "m1", "M1 ", "M2", "M4"],
+            "Nazev": ["A", "A", "A", "B", "D"],
+            "Batch": ["B1", "b1", "B1", "B2", "B4"],
+            "Mnozstvi_RABEN": [4.0, 4.0, 2.0, 7.0, 3.0],
+        })
+        for df in (self.df_sap, self.df_raben):
+            df[KEY_COLUMN] = compute_keys(df)
+        self.output_file = "test_vysledky_temp.xlsx"
+        self.snapshot_file = "test_snapshot_temp.sqlite"
+
+    def reconcile_units(self, df_sap=None, df_raben=None):
+        # Výsledek v celých jednotkách, jak ho vrací compare_data (vstup pro write_report a delta)
+        df_sap = self.df_sap if df_sap is None else df_sap
+        df_raben = self.df_raben if df_raben is None else df_raben
+        return reconcile(df_sap.assign(Mnozstvi_SAP=to_units(df_sap["Mnozstvi_SAP"])),
+                         df_raben.assign(Mnozstvi_RABEN=to_units(df_raben["Mnozstvi_RABEN"])))
+
+    def test_reconcile(self):
+        df, summary = reconcile(self.df_sap, self.df_raben)
+
+        self.assertEqual(len(df), 4, "Duplicitní klíče se mají před párováním sečíst.")
+        by_mat = df.set_index("Material")
+        self.assertEqual(by_mat.loc["M1", "Mnozstvi_RABEN"], 10.0)
+        self.assertEqual(by_mat.loc["M1", "STAV"], "STAV OK")
+        self.assertEqual(by_mat.loc["M2", "STAV"], "RABEN manko")
+        self.assertEqual(by_mat.loc["M3", "STAV"], "RABEN přebytek")
+        self.assertEqual(by_mat.loc["M4", "Mnozstvi_SAP"], 0)
+
+        totals = summary.set_index("STAV")
+        self.assertListEqual(list(totals["Pocet"]), [1, 2, 1])
+        self.assertEqual(totals.loc["RABEN manko", "Rozdil"], 5.0)
+
+    def test_reconcile_exact_units(self):
+        # 0.1 + 0.2 != 0.3 ve float; v celých jednotkách je součet palet přesný
+        df_sap = pd.DataFrame({"Material": ["M1"], "Nazev": ["A"], "Batch": ["B1"],
+                               "Mnozstvi_SAP": to_units(pd.Series([0.3]))})
+        df_raben = pd.DataFrame({"Material": ["M1", "M1"], "Nazev": ["A", "A"], "Batch": ["B1", "B1"],
+                                 "Mnozstvi_RABEN": to_units(pd.Series(["0.1", "0.2"]))})
+        df = compare_data(df_sap, df_raben, self.output_file)
+
+        self.assertEqual(df.loc[0, "STAV"], "STAV OK")
+        self.assertEqual(df["Mnozstvi_RABEN"].dtype, "int64")
+        self.assertEqual(df.loc[0, "Mnozstvi_RABEN"], 0.3 * QUANTITY_SCALE)
+        ws = openpyxl.load_workbook(self.output_file)["Vysledky"]
+        self.assertEqual(ws["E2"].value, 0.3, "Do reportu jde desetinné množství.")
+
+    def test_compare_data_int_quantities(self):
+        # Vlastní tabulky s units=False: celá čísla na vstupu jsou kusy, ne jednotky (podle typu se nehádá)
+        df_sap = pd.DataFrame({"Material": ["M1"], "Nazev": ["A"], "Batch": ["B1"], "Mnozstvi_SAP": [10]})
+        df_raben = pd.DataFrame({"Material": ["M1"], "Nazev": ["A"], "Batch": ["B1"], "Mnozstvi_RABEN": [7.0]})
+        with self.assertRaisesRegex(ValueError, "Mnozstvi_RABEN.*units=False"):
+            compare_data(df_sap, df_raben)
+        df = compare_data(df_sap, df_raben, self.output_file, units=False)
+
+        self.assertEqual(from_units(df.loc[0, "Mnozstvi_SAP"]), 10)
+        self.assertEqual(from_units(df.loc[0, "Rozdil"]), -3)
+        self.assertEqual(df.loc[0, "STAV"], "RABEN přebytek")
+        ws = openpyxl.load_workbook(self.output_file)["Vysledky"]
+        self.assertEqual(ws["D2"].value, 10)
+
+    def test_compare_data_formatting(self):
+        compare_data(self.df_sap, self.df_raben, self.output_file, units=False)
+
+        wb = openpyxl.load_workbook(self.output_file)
+        ws = wb["Vysledky"]
+        self.assertTrue(ws["A1"].font.b, "Hlavička má být tučná.")
+        rules = [rule for cf in ws.conditional_formatting for rule in cf.rules]
+        self.assertEqual(len(rules), 3, "Barvení STAV má být jako 3 pravidla podmíněného formátu.")
+        self.assertEqual(ws.column_dimensions["B"].width, len("Nazev") + 2)
+        self.assertIn("Souhrn", wb.sheetnames)
+
+    def test_delta(self):
+        previous, _ = self.reconcile_units()
+        save_snapshot(previous, self.snapshot_file)
+
+        df_raben = self.df_raben[self.df_raben["Material"] != "M4"].copy()
+        df_raben.loc[df_raben["Material"] == "M2", "Mnozstvi_RABEN"] = 5.0
+        current, _ = self.reconcile_units(df_raben=df_raben)
+
+        changes = compute_delta(current, load_snapshot(self.snapshot_file)).set_index("Material")
+        self.assertListEqual(sorted(changes.index), ["M2", "M4"], "Nezměněné klíče do delta nepatří.")
+        self.assertEqual(changes.loc["M2", "ZMENA"], "změna množství")
+        self.assertEqual(changes.loc["M2", "STAV"], "STAV OK")
+        self.assertEqual(changes.loc["M4", "ZMENA"], "zmizel")
+
+        self.assertTrue((compute_delta(current, None)["ZMENA"] == "nový").all())
+
+    def test_write_report_sharded(self):
+        df, summary = self.reconcile_units()
+        self.written = write_report(self.output_file, df, summary, sheet_rows=3)
+
+        data_file = "test_vysledky_temp_data_1.xlsx"
+        self.assertListEqual(self.written, [self.output_file, data_file])
+        wb = openpyxl.load_workbook(data_file)
+        self.assertListEqual(wb.sheetnames, ["Vysledky_1", "Vysledky_2"])
+        self.assertEqual(wb["Vysledky_2"].max_row, 2, "Zbylý řádek jde na druhý list s hlavičkou.")
+        for ws in wb.worksheets:
+            self.assertEqual(len([r for cf in ws.conditional_formatting for r in cf.rules]), 3)
+        self.assertEqual(wb["Vysledky_1"].column_dimensions["B"].width, wb["Vysledky_2"].column_dimensions["B"].width)
+
+        files = pd.read_excel(self.output_file, sheet_name="Soubory")
+        self.assertListEqual(files["Radku"].tolist(), [3, 1])
+        self.assertIn("Souhrn", openpyxl.load_workbook(self.output_file).sheetnames)
+
+    def test_write_report_csv(self):
+        df, summary = self.reconcile_units()
+        self.written = write_report(self.output_file, df, summary, output_format="csv")
+
+        data = pd.read_csv("test_vysledky_temp.csv")
+        self.assertEqual(len(data), len(df))
+        self.assertEqual(data["Rozdil"].sum(), from_units(df["Rozdil"].sum()))
+        self.assertListEqual(openpyxl.load_workbook(self.output_file).sheetnames, ["Souhrn", "Soubory"])
+
+    def test_preview(self):
+        df, _ = reconcile(self.df_sap, self.df_raben)
+        top = top_differences(df, 2)
+        # |Rozdil|: M4 3, M2 2, M3 1, M1 0
+        self.assertListEqual(list(top["Material"]), ["M4", "M2"])
+        self.assertEqual(len(top_differences(df, 10)), 3, "Klíče bez rozdílu do náhledu nepatří.")
+
+        self.written = ["test_nahled_temp.xlsx"]
+        compare_data(self.df_sap, self.df_raben, preview=2, preview_path=self.written[0], units=False)
+        self.assertFalse(os.path.exists(self.output_file), "Bez output_path se celý report nepíše.")
+        wb = openpyxl.load_workbook(self.written[0])
+        self.assertListEqual(wb.sheetnames, ["Top", "Souhrn"])
+        self.assertEqual(wb["Top"]["F2"].value, 3.0)
+
+    def tearDown(self):
+        for path in [self.output_file, self.snapshot_file] + getattr(self, "written", []):
+            if os.path.exists(path):
+                os.remove(path)
+
+if __name__ == "__main__":
+    unittest.main()
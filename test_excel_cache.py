@@ -0,0 +1,51 @@
+import unittest
+import os
+import shutil
+import excel_cache
+
+class TestExcelCache(unittest.TestCase):
+
+    def setUp(self):
+        self.orig_dir = excel_cache.CACHE_DIR
+        excel_cache.CACHE_DIR = "test_cache_temp"
+        self.source = "test_cache_source_temp.bin"
+        with open(self.source, "wb") as f:
+            f.write(b"obsah")
+        self.calls = 0
+
+    def loader(self):
+        self.calls += 1
+        return {"data": [1, 2, 3]}
+
+    def test_cached(self):
+        first = excel_cache.cached(self.source, "auto", {"dtype": str}, self.loader, use_cache=True)
+        second = excel_cache.cached(self.source, "auto", {"dtype": str}, self.loader, use_cache=True)
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, 1, "Nezměněný soubor se má vzít z cache.")
+
+        excel_cache.cached(self.source, "auto", {}, self.loader, use_cache=True)
+        self.assertEqual(self.calls, 2, "Jiné volby čtení = jiný klíč.")
+
+        with open(self.source, "ab") as f:
+            f.write(b" zmena")
+        excel_cache.cached(self.source, "auto", {"dtype": str}, self.loader, use_cache=True)
+        self.assertEqual(self.calls, 3, "Změněný obsah souboru = jiný klíč.")
+
+        excel_cache.cached(self.source, "auto", {"dtype": str}, self.loader, use_cache=False)
+        self.assertEqual(self.calls, 4, "use_cache=False má cache obejít.")
+
+    def test_evict(self):
+        excel_cache.cached(self.source, "auto", {}, self.loader, use_cache=True)
+        self.assertEqual(len(os.listdir(excel_cache.CACHE_DIR)), 1)
+
+        excel_cache.evict(max_mb=0)
+        self.assertEqual(len(os.listdir(excel_cache.CACHE_DIR)), 0)
+
+    def tearDown(self):
+        shutil.rmtree(excel_cache.CACHE_DIR, ignore_errors=True)
+        excel_cache.CACHE_DIR = self.orig_dir
+        if os.path.exists(self.source):
+            os.remove(self.source)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import pandas as pd
+import os
+import shutil
+import sqlite3
+from history import record_run, key_series, aging
+from compare_processor import urcit_stav
+from keys import compute_keys
+from utils import to_units
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = "test_history_temp"
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.history_file = os.path.join(self.work_dir, "historie.sqlite")
+
+    def result(self, rows):
+        df = pd.DataFrame(rows, columns=["Material", "Batch", "Mnozstvi_SAP", "Mnozstvi_RABEN"])
+        df["Nazev"] = "Popis"
+        df["HASH"] = compute_keys(df)
+        df["Mnozstvi_SAP"] = to_units(df["Mnozstvi_SAP"])
+        df["Mnozstvi_RABEN"] = to_units(df["Mnozstvi_RABEN"])
+        # Stejné znaménko a STAV jako compare_processor.reconcile
+        df["Rozdil"] = df["Mnozstvi_RABEN"] - df["Mnozstvi_SAP"]
+        df["STAV"] = urcit_stav(df["Rozdil"])
+        return df
+
+    def test_series_and_aging(self):
+        record_run(self.result([("M1", "B1", 10, 10), ("M2", "B2", 5, 3), ("M3", "B3", 1, 2)]),
+                   self.history_file, run_id="r1", cutoff="2024-01-01")
+        record_run(self.result([("M1", "B1", 10, 9.5), ("M2", "B2", 5, 3), ("M3", "B3", 1, 1)]),
+                   self.history_file, run_id="r2", cutoff="2024-01-05")
+        # Opakovaný zápis stejného běhu nahradí jeho řádky
+        record_run(self.result([("M1", "B1", 10, 9.5), ("M2", "B2", 5, 3), ("M3", "B3", 1, 1)]),
+                   self.history_file, run_id="r2", cutoff="2024-01-05")
+        record_run(self.result([("M1", "B1", 10, 9.5), ("M2", "B2", 5, 4)]),
+                   self.history_file, run_id="r3", cutoff="2024-01-10")
+
+        series = key_series("M1", " b1 ", self.history_file)
+        self.assertListEqual(list(series["cutoff"]), ["2024-01-01", "2024-01-05", "2024-01-10"])
+        self.assertListEqual(list(series["Rozdil"]), [0, -0.5, -0.5])
+        self.assertEqual(len(key_series("M2", history_path=self.history_file)), 3)
+
+        df = aging(self.history_file).set_index("Material")
+        self.assertListEqual(list(df.index), ["M2", "M1"])
+        self.assertEqual(df.loc["M2", "Od"], "2024-01-01")
+        self.assertEqual(df.loc["M2", "Dni"], 9)
+        self.assertEqual(df.loc["M2", "Rozdil"], -1)
+        self.assertEqual(df.loc["M2", "STAV"], "RABEN přebytek")
+        self.assertEqual(df.loc["M1", "Od"], "2024-01-05")
+        self.assertEqual(df.loc["M1", "Behu"], 2)
+        self.assertListEqual(list(aging(self.history_file, min_days=6)["Material"]), ["M2"])
+        self.assertTrue(aging(self.history_file, stav="RABEN manko").empty)
+
+    def test_invalid_cutoff(self):
+        df = self.result([("M1", "B1", 10, 9)])
+        with self.assertRaisesRegex(ValueError, "YYYY-MM-DD"):
+            record_run(df, self.history_file, run_id="r1", cutoff="17.10.2026")
+        record_run(df, self.history_file, run_id="r1", cutoff=" 2026-10-17 ")
+        self.assertEqual(aging(self.history_file).loc[0, "Od"], "2026-10-17")
+
+    def test_rekey_old_history(self):
+        # Historie s klíči starší verze (user_version 0/1) se při otevření přepočítá z Material a Batch
+        record_run(self.result([("M1", "B1", 10, 9)]), self.history_file, run_id="r1", cutoff="2024-01-01")
+        con = sqlite3.connect(self.history_file)
+        with con:
+            con.execute("UPDATE history SET HASH = 12345")
+            con.execute("PRAGMA user_version = 1")
+        con.close()
+        record_run(self.result([("M1", "B1", 10, 9)]), self.history_file, run_id="r2", cutoff="2024-01-03")
+
+        self.assertEqual(len(key_series("M1", "B1", self.history_file)), 2)
+        self.assertEqual(aging(self.history_file).loc[0, "Od"], "2024-01-01")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    unittest.main()
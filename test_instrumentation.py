@@ -0,0 +1,63 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import shutil
+import instrumentation
+from instrumentation import get_logger, stage, start_run, run_records
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = "test_instrumentation_temp"
+        self.report = os.path.join(self.work_dir, "behy.jsonl")
+        self.old_report = instrumentation.REPORT_FILE
+        self.old_profile = instrumentation.PROFILE_DIR
+        self.old_trace = instrumentation.TRACE_MEMORY
+
+    def test_stage_records_and_report(self):
+        run_id = start_run(self.report)
+        instrumentation.PROFILE_DIR = os.path.join(self.work_dir, "prof")
+        instrumentation.TRACE_MEMORY = True
+
+        with stage("krok.ok", rows_in=10) as st:
+            data = list(range(1000))
+            st["rows_out"] = 7
+        with self.assertRaises(ValueError):
+            with stage("krok.chyba"):
+                raise ValueError("vadná data")
+
+        records = run_records()
+        self.assertEqual([r["stage"] for r in records], ["krok.ok", "krok.chyba"])
+        ok, failed = records
+        self.assertEqual((ok["rows_in"], ok["rows_out"], ok["status"]), (10, 7, "ok"))
+        self.assertGreaterEqual(ok["wall_s"], 0)
+        self.assertIsNotNone(ok["tracemalloc_peak_mb"])
+        # Špička procesu je kumulativní, za krok se bere jen změna RSS
+        self.assertIn("rss_delta_mb", ok)
+        self.assertGreaterEqual(failed["process_rss_peak_mb"], ok["process_rss_peak_mb"])
+        self.assertEqual(failed["status"], "chyba")
+        self.assertEqual(failed["error"], "ValueError: vadná data")
+        self.assertTrue(os.path.exists(os.path.join(self.work_dir, "prof", "krok.ok.prof")))
+
+        with open(self.report, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines, records)
+        self.assertTrue(all(line["run"] == run_id for line in lines))
+
+    def test_logger_follows_redirected_stdout(self):
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            get_logger("test").info("zpráva do logu")
+        self.assertEqual(buffer.getvalue(), "zpráva do logu\n")
+
+    def tearDown(self):
+        instrumentation.REPORT_FILE = self.old_report
+        instrumentation.PROFILE_DIR = self.old_profile
+        instrumentation.TRACE_MEMORY = self.old_trace
+        if os.path.exists(self.work_dir):
+            shutil.rmtree(self.work_dir)
+
+if __name__ == '__main__':
+    unittest.main()
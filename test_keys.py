@@ -0,0 +1,30 @@
+import unittest
+import pandas as pd
+from keys import compute_keys, keys_to_hex, ensure_keys, KEY_COLUMN
+
+class TestKeys(unittest.TestCase):
+
+    def test_normalization(self):
+        df = pd.DataFrame({"Material": [" m1", "M1", "M1", None], "Batch": ["b1 ", "B1", "B2", None]})
+        keys = compute_keys(df)
+
+        self.assertEqual(keys.dtype, "int64")
+        self.assertEqual(keys[0], keys[1], "Klíč má ignorovat mezery a velikost písmen.")
+        self.assertNotEqual(keys[1], keys[2])
+
+    def test_stable_digest(self):
+        # Klíč je uložený ve snapshotu a historii: pevná hodnota nezávislá na verzi pandas
+        keys = compute_keys(pd.DataFrame({"Material": [" m1"], "Batch": ["b1"]}))
+        self.assertEqual(keys[0], 2979845053020403389)
+        self.assertEqual(keys_to_hex(keys)[0], "295a8949aefc76bd")
+
+    def test_hex_roundtrip(self):
+        df = pd.DataFrame({"Material": ["M1", "M2", "M3"], "Batch": ["B1", "", None]})
+        keys = compute_keys(df)
+        stored = pd.DataFrame({KEY_COLUMN: keys_to_hex(keys), "Material": ["X"] * 3, "Batch": ["Y"] * 3})
+
+        self.assertTrue(keys_to_hex(keys).str.len().eq(16).all())
+        self.assertListEqual(list(ensure_keys(stored)), list(keys), "Uložený hex klíč se má převzít beze změny.")
+
+if __name__ == "__main__":
+    unittest.main()
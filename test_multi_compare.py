@@ -0,0 +1,74 @@
+import unittest
+import pandas as pd
+import os
+import shutil
+from multi_compare import parse_providers, compare_many
+from utils import from_units
+
+class TestMultiCompare(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = "test_multi_temp"
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.sap_file = os.path.join(self.work_dir, "SAP.xlsx")
+        self.output_file = os.path.join(self.work_dir, "vysledky.xlsx")
+
+        pd.DataFrame({
+            "Material": ["M1", "M1", "M2", "M3", "M9", "TOP"],
+            "Material description": ["A", "A", "B", "C", "X", "Top"],
+            "Batch": ["B1", "B1", "B2", "B3", "B9", "T1"],
+            "Total Quantity": [10, 4, 5, 7, 1, 1000],
+            "Storage location": ["F010", "F020", "F020", "F010", "F999", "F010"],
+        }).to_excel(self.sap_file, index=False)
+        pd.DataFrame({
+            "1-Císlo zboží": ["M1", "M3", "P123"],
+            "3-název": ["A", "C", "Paleta"],
+            "4-ks": ["10,00", "6,50", "1,00"],
+            "12-šarže": ["B1", "B3", "X"],
+        }).to_excel(os.path.join(self.work_dir, "RABEN.xlsx"), index=False)
+        pd.DataFrame({
+            "SKU": ["M1", "M2", "M4"],
+            "LOT": ["B1", "B2", "B4"],
+            "QTY": ["4", "5", "2"],
+        }).to_excel(os.path.join(self.work_dir, "DHL.xlsx"), index=False)
+
+        self.config = {"providers": [
+            {"name": "RABEN", "file": "RABEN.xlsx", "locations": ["F010"],
+             "column_mapping": {"1-Císlo zboží": "Material", "3-název": "Nazev", "4-ks": "Mnozstvi", "12-šarže": "Batch"},
+             "rules": [{"name": "obaly", "type": "exclude", "pattern": r"^P\d{3,4}$"}]},
+            {"name": "DHL", "file": "DHL.xlsx", "locations": ["F020"],
+             "column_mapping": {"SKU": "Material", "LOT": "Batch", "QTY": "Mnozstvi"}},
+        ]}
+
+    def test_compare_many(self):
+        providers, sap_rules = parse_providers(self.config, self.work_dir)
+        df = compare_many(self.sap_file, providers, output_path=self.output_file, sap_rules=sap_rules)
+
+        by_mat = df.set_index("Material")
+        self.assertNotIn("P123", by_mat.index, "Pravidla poskytovatele se mají použít.")
+        self.assertNotIn("M9", by_mat.index, "Lokace mimo poskytovatele se nepárují.")
+        self.assertEqual(by_mat.loc["M1", "STAV_RABEN"], "STAV OK")
+        self.assertEqual(by_mat.loc["M1", "STAV_DHL"], "STAV OK")
+        self.assertEqual(from_units(by_mat.loc["M1", "Mnozstvi_SAP"]), 14)
+        self.assertEqual(by_mat.loc["M3", "STAV_RABEN"], "RABEN přebytek")
+        self.assertEqual(from_units(by_mat.loc["M3", "Rozdil"]), -0.5)
+        self.assertEqual(by_mat.loc["M4", "STAV"], "manko")
+        self.assertEqual(by_mat.loc["M4", "Mnozstvi_SAP_DHL"], 0)
+
+        summary = pd.read_excel(self.output_file, sheet_name="Souhrn").set_index("Poskytovatel")
+        self.assertListEqual(list(summary.index), ["RABEN", "DHL", "Celkem"])
+        self.assertEqual(summary.loc["Celkem", "Rozdil"], 1.5)
+
+    def test_invalid_config(self):
+        config = {"providers": [dict(self.config["providers"][0]), dict(self.config["providers"][1], locations=[])]}
+        with self.assertRaisesRegex(ValueError, "buď všichni"):
+            parse_providers(config)
+        config = {"providers": [dict(self.config["providers"][1], column_mapping={"SKU": "Material"})]}
+        with self.assertRaisesRegex(ValueError, "nemapuje Batch, Mnozstvi"):
+            parse_providers(config)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import pandas as pd
+import os
+import shutil
+from pipeline import run_pipeline
+from sap_processor import process_file
+from raben_processor import process_raben_file
+import merge_processor
+import compare_processor
+import ingest
+from ingest import ingest_sources, ingest_sequential, to_payload, from_payload
+from utils import from_units
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = "test_pipeline_temp"
+        self.output_dir = os.path.join(self.work_dir, "output")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.sap_file = os.path.join(self.work_dir, "SAP.xlsx")
+        self.raben_file = os.path.join(self.work_dir, "RABEN.xlsx")
+
+        sap = {
+            "Material": ["M1", "M2", "M3", "TOP"],
+            "Material description": ["Desc A", "Desc B", "Desc C", "Top"],
+            "Batch": ["B1", "B2", "B3", "T1"],
+            "Total Quantity": [10, 5, 7, 1000],
+            "Storage location": ["F010", "F070", "F010", "F010"],
+        }
+        raben = {
+            "1-Císlo zboží": ["M1", "M2", "M4", "P123"],
+            "3-název": ["Desc A", "Desc B", "Desc D", "Paleta"],
+            "4-ks": ["10,00", "2,00", "1 500,50", "1,00"],
+            "12-šarže": ["B1", "B2", "B4", "X"],
+        }
+        pd.DataFrame(sap).to_excel(self.sap_file, sheet_name="Sheet1", index=False)
+        pd.DataFrame(raben).to_excel(self.raben_file, sheet_name="stock", index=False)
+
+    def test_run_pipeline(self):
+        df = run_pipeline(self.sap_file, self.raben_file, self.output_dir)
+
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, "vysledky.xlsx")))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "SAP.xlsx")),
+                         "Mezivýstupy se bez write_intermediate nemají zapisovat.")
+
+        stav = dict(zip(df["Material"], df["STAV"]))
+        self.assertEqual(stav["M1"], "STAV OK")
+        self.assertEqual(stav["M2"], "RABEN přebytek")
+        self.assertEqual(stav["M3"], "RABEN přebytek")
+        self.assertEqual(stav["M4"], "RABEN manko")
+        self.assertNotIn("TOP", stav, "První řádek po sortu se má smazat.")
+        self.assertNotIn("P123", stav, "Obaly se mají odfiltrovat.")
+
+    def test_run_pipeline_intermediate(self):
+        run_pipeline(self.sap_file, self.raben_file, self.output_dir, write_intermediate=True)
+
+        for name in ("SAP.xlsx", "RABEN.xlsx", "POROVNANI_SKLADU.xlsx", "vysledky.xlsx"):
+            self.assertTrue(os.path.exists(os.path.join(self.output_dir, name)), f"Chybí {name}")
+
+    def test_concurrent_ingest(self):
+        df_sap, df_raben = ingest_sources(self.sap_file, self.raben_file, concurrent=True)
+        seq_sap, seq_raben = ingest_sources(self.sap_file, self.raben_file, concurrent=False)
+        pd.testing.assert_frame_equal(df_sap, seq_sap)
+        pd.testing.assert_frame_equal(df_raben, seq_raben)
+
+        # Chyba jedné strany nese její označení, druhá se dokončí
+        broken = os.path.join(self.work_dir, "broken.xlsx")
+        pd.DataFrame({"X": [1]}).to_excel(broken, index=False)
+        with self.assertRaisesRegex(RuntimeError, "RABEN: ValueError") as ctx:
+            ingest_sources(self.sap_file, broken, concurrent=True)
+        self.assertNotIn("SAP:", str(ctx.exception))
+
+    def test_processor_chain_defaults(self):
+        # Procesory, process_merge i compare_data se shodují na celých jednotkách bez dalších parametrů
+        df = compare_processor.compare_data(*merge_processor.process_merge(process_file(self.sap_file),
+                                                                           process_raben_file(self.raben_file)))
+        expected = run_pipeline(self.sap_file, self.raben_file, self.output_dir, concurrent=False)
+
+        pd.testing.assert_frame_equal(df, expected)
+        rozdil = dict(zip(df["Material"], from_units(df["Rozdil"])))
+        self.assertEqual(rozdil["M2"], -3)
+        self.assertEqual(rozdil["M4"], 1500.5)
+
+    def run_scripts(self, output_dir):
+        # Stejný řetězec jako čtyři samostatné skripty: mezi kroky se čte a zapisuje Excel
+        os.makedirs(output_dir, exist_ok=True)
+        sap_out, raben_out = os.path.join(output_dir, "SAP.xlsx"), os.path.join(output_dir, "RABEN.xlsx")
+        merged = os.path.join(output_dir, "POROVNANI_SKLADU.xlsx")
+        process_file(self.sap_file, sap_out)
+        process_raben_file(self.raben_file, raben_out)
+        merge_processor.process_merge(*merge_processor.load_inputs(sap_out, raben_out), merged)
+        return compare_processor.compare_data(*compare_processor.load_inputs(merged))
+
+    def test_pipeline_matches_scripts_numeric_batch(self):
+        # Číselná šarže s prázdnou buňkou: pandas ji v SAP načte jako float (123.0)
+        pd.DataFrame({
+            "Material": ["M1", "M2", "M3", "TOP"],
+            "Material description": ["A", "B", "C", "Top"],
+            "Batch": [123, None, 5, 9],
+            "Total Quantity": [10, 5, 7, 1000],
+            "Storage location": ["F010", "F010", "F010", "F010"],
+        }).to_excel(self.sap_file, sheet_name="Sheet1", index=False)
+        pd.DataFrame({
+            "1-Císlo zboží": ["M1", "M2"],
+            "3-název": ["A", "B"],
+            "4-ks": ["10,00", "5,00"],
+            "12-šarže": ["123", None],
+        }).to_excel(self.raben_file, sheet_name="cz_stock_function", index=False)
+
+        expected = self.run_scripts(os.path.join(self.work_dir, "skripty"))
+        df = run_pipeline(self.sap_file, self.raben_file, self.output_dir, concurrent=False)
+
+        stav = dict(zip(df["Material"], df["STAV"]))
+        self.assertEqual(len(df), 3)
+        self.assertEqual(stav["M1"], "STAV OK")
+        self.assertEqual(stav["M2"], "STAV OK")
+        pd.testing.assert_frame_equal(df.drop(columns="HASH"), expected.drop(columns="HASH"), check_dtype=False)
+        self.assertListEqual(list(df["HASH"]), list(expected["HASH"]))
+
+    @unittest.skipIf(ingest.pa is None, "pyarrow není nainstalované")
+    def test_arrow_payload(self):
+        # Výstupy obou procesorů (text + celé jednotky) jdou přes Arrow IPC beze ztráty
+        for df in ingest_sequential(self.sap_file, self.raben_file):
+            payload = to_payload(df)
+            self.assertEqual(payload[0], "arrow")
+            pd.testing.assert_frame_equal(from_payload(payload), df)
+
+    def test_frame_payload(self):
+        # Bez pyarrow se vrací přímo DataFrame, serializuje ho až executor
+        original = ingest.pa
+        ingest.pa = None
+        try:
+            df = ingest_sequential(self.sap_file, self.raben_file)[0]
+            payload = to_payload(df)
+            self.assertEqual(payload[0], "frame")
+            self.assertIs(from_payload(payload), df)
+        finally:
+            ingest.pa = original
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import pandas as pd
+from rules import parse_rules, apply_rules, load_rules
+from utils import to_units, from_units
+
+class TestRules(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "Material": ["P123", "p4567", "ZE001906", "M1", "OLD", "M2"],
+            "Batch": ["", "", "B1", "B2", "B3", "B4"],
+            "Sklad": ["A", "A", "A", "A", "A", "X"],
+            "Mnozstvi_RABEN": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        })
+        self.rules = parse_rules({"raben": [
+            {"name": "obaly", "type": "exclude", "pattern": r"^P\d{3,4}$", "ignore_case": True},
+            {"name": "ze", "type": "multiply", "values": ["ZE001906"], "factor": 50},
+            {"name": "dvojnasobek", "type": "multiply", "values": ["ZE001906", "M1"], "factor": 2},
+            {"name": "prejmenovani", "type": "rename", "mapping": {"OLD": "M1"}},
+            {"name": "sklad", "type": "keep", "column": "Sklad", "values": ["A"]},
+        ]})["raben"]
+
+    def test_apply_rules(self):
+        for df in (self.df, self.df.astype({"Material": "category"})):
+            out, hits = apply_rules(df, self.rules, "Mnozstvi_RABEN")
+            self.assertListEqual(out["Material"].astype(str).tolist(), ["ZE001906", "M1", "M1"])
+            self.assertListEqual(out["Mnozstvi_RABEN"].tolist(), [300.0, 8.0, 5.0])
+            self.assertDictEqual(hits, {"obaly": 2, "ze": 1, "dvojnasobek": 2, "prejmenovani": 1, "sklad": 1})
+        # Množství v celých jednotkách zůstávají int64
+        out, _ = apply_rules(self.df.assign(Mnozstvi_RABEN=to_units(self.df["Mnozstvi_RABEN"])),
+                             self.rules, "Mnozstvi_RABEN")
+        self.assertEqual(out["Mnozstvi_RABEN"].dtype, "int64")
+        self.assertListEqual(from_units(out["Mnozstvi_RABEN"]).tolist(), [300.0, 8.0, 5.0])
+        # Vstup zůstává beze změny
+        self.assertEqual(self.df["Mnozstvi_RABEN"].sum(), 21.0)
+
+    def test_invalid_rules(self):
+        with self.assertRaisesRegex(ValueError, "neznámý typ"):
+            parse_rules({"raben": [{"name": "x", "type": "smazat", "values": ["A"]}]})
+        with self.assertRaisesRegex(ValueError, "neplatný regex"):
+            parse_rules({"raben": [{"name": "x", "type": "exclude", "pattern": "("}]})
+        with self.assertRaisesRegex(ValueError, "sloupec 'Lokace'"):
+            apply_rules(self.df, parse_rules({"raben": [
+                {"type": "keep", "column": "Lokace", "values": ["F010"]}]})["raben"], "Mnozstvi_RABEN")
+
+    def test_default_rules_file(self):
+        rules = load_rules()
+        self.assertEqual([r["type"] for r in rules["raben"]], ["exclude", "multiply"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,9 @@ import unittest
 import pandas as pd
 import openpyxl
 import os
+import sap_processor
 from sap_processor import process_file
+from utils import from_units
 
 class TestSapProcessor(unittest.TestCase):
     
@@ -44,6 +46,38 @@ class TestSapProcessor(unittest.TestCase):
         
         print("[TEST] Všechny kontroly prošly úspěšně!")
 
+    def test_process_csv_streaming(self):
+        print("[TEST] Spouštím process_file nad CSV po blocích...")
+        csv_file = "test_input_temp.csv"
+        pd.read_excel(self.input_file, dtype=str).to_csv(csv_file, sep=";", index=False)
+
+        original_chunk = sap_processor.CHUNK_SIZE
+        sap_processor.CHUNK_SIZE = 1
+        try:
+            # Po jednom řádku: největší řádek a filtr lokací se řeší přes hranice bloků
+            df_csv = process_file(csv_file)
+            _, top_label = sap_processor.read_flat_file(csv_file)
+            self.assertEqual(top_label, sap_processor.read_flat_file(csv_file, chunk_size=100)[1])
+        finally:
+            sap_processor.CHUNK_SIZE = original_chunk
+            os.remove(csv_file)
+
+        self.assertListEqual(list(df_csv.columns), ["Material", "Nazev", "Batch", "Mnozstvi_SAP"])
+        self.assertListEqual(list(df_csv["Material"]), ["M1", "M4"], "Filtr lokací nebo smazání největšího řádku nesedí.")
+        # Množství jsou v paměti v celých jednotkách (int64)
+        self.assertListEqual(list(from_units(df_csv["Mnozstvi_SAP"])), [10, 0])
+
+    def test_process_csv_encoding(self):
+        csv_file = "test_input_cp1250_temp.csv"
+        df = pd.read_excel(self.input_file, dtype=str)
+        df["Material description"] = "Čerpadlo žluté"
+        df.to_csv(csv_file, sep=";", index=False, encoding="cp1250")
+        try:
+            df_csv = process_file(csv_file, encoding="cp1250")
+        finally:
+            os.remove(csv_file)
+        self.assertEqual(df_csv["Nazev"].iloc[0], "Čerpadlo žluté")
+
     def tearDown(self):
         if os.path.exists(self.input_file):
             os.remove(self.input_file)
@@ -0,0 +1,145 @@
+import unittest
+import pandas as pd
+import openpyxl
+import os
+import re
+import zipfile
+import utils
+import instrumentation
+from utils import find_best_sheet, load_best_sheet, write_excel_tables, parse_quantity_report, read_sheet_stream, text_values, compact_text
+
+class TestUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.input_file = "test_utils_temp.xlsx"
+        self.output_file = "test_utils_output_temp.xlsx"
+
+        with pd.ExcelWriter(self.input_file, engine='openpyxl') as writer:
+            pd.DataFrame({"A": [1]}).to_excel(writer, sheet_name="Malý", index=False)
+            pd.DataFrame({"Material": ["M1", "M2", "M3"], "Batch": ["B1", "B2", "B3"]}).to_excel(
+                writer, sheet_name="Data", index=False)
+            pd.DataFrame().to_excel(writer, sheet_name="Prázdný", index=False)
+
+    def test_find_best_sheet(self):
+        self.assertEqual(find_best_sheet(self.input_file), "Data")
+
+    def rewrite_dimension(self, replacement):
+        # Export z jiného nástroje: list "Data" (sheet2.xml) s nulovou nebo chybějící dimenzí
+        with zipfile.ZipFile(self.input_file) as src:
+            parts = {name: src.read(name) for name in src.namelist()}
+        xml = parts["xl/worksheets/sheet2.xml"].decode("utf-8")
+        parts["xl/worksheets/sheet2.xml"] = re.sub(r'<dimension ref="[^"]*"\s*/>', replacement, xml).encode("utf-8")
+        with zipfile.ZipFile(self.input_file, "w", zipfile.ZIP_DEFLATED) as dst:
+            for name, data in parts.items():
+                dst.writestr(name, data)
+
+    def test_find_best_sheet_bad_dimension(self):
+        for replacement in ('<dimension ref="A1:A1"/>', ""):
+            self.rewrite_dimension(replacement)
+            self.assertEqual(find_best_sheet(self.input_file), "Data",
+                             f"Dimenze '{replacement}' se má dopočítat skenem listu.")
+
+    def test_load_best_sheet(self):
+        sheet_name, df = load_best_sheet(self.input_file, dtype=str)
+
+        self.assertEqual(sheet_name, "Data")
+        self.assertListEqual(list(df.columns), ["Material", "Batch"])
+        self.assertEqual(len(df), 3)
+
+    def test_load_best_sheet_columns(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(["Navic", " 4-KS ", "Material", "4-ks", "Jiny"])
+        ws.append(["x", "1,00", "M1", "9,00", "y"])
+        ws.append(["x", "2,00", "M2", "9,00", "y"])
+        wb.save(self.output_file)
+
+        # Jen hledané sloupce, bez ohledu na mezery/velikost písmen, u duplicit první výskyt
+        _, df = load_best_sheet(self.output_file, use_cache=False, columns=["material", "4-ks"], dtype=str)
+        self.assertListEqual(list(df.columns), [" 4-KS ", "Material"])
+        self.assertListEqual(df[" 4-KS "].tolist(), ["1,00", "2,00"])
+
+    def test_load_best_sheet_header_probe(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Export"
+        ws.append(["Stav skladu k 1.1."])
+        ws.append([])
+        ws.append(["Material", "Batch", "Total Quantity"])
+        ws.append(["M1", "B1", 5])
+        ws.append(["M2", "B2", 7])
+        info = wb.create_sheet("Info")
+        for i in range(20):
+            info.append([f"poznámka {i}", "x", "y", "z"])
+        wb.save(self.output_file)
+
+        # Hlavička pod titulkem, list s menší plochou, ale se všemi sloupci
+        for reader in utils.EXCEL_READERS:
+            utils.EXCEL_READER = reader
+            try:
+                sheet_name, df = load_best_sheet(self.output_file, use_cache=False,
+                                                 columns=["material", "batch", "total quantity"])
+            finally:
+                utils.EXCEL_READER = "stream"
+            self.assertEqual(sheet_name, "Export")
+            self.assertListEqual(list(df.columns), ["Material", "Batch", "Total Quantity"])
+            self.assertListEqual(df["Total Quantity"].tolist(), [5, 7])
+
+        # Chybějící povinný sloupec = chyba ještě před načtením listu
+        instrumentation.start_run()
+        with self.assertRaisesRegex(ValueError, "chybí povinné sloupce: Storage location"):
+            load_best_sheet(self.output_file, use_cache=False, columns=["material", "storage location"],
+                            required=["Material", "Storage location"])
+        self.assertNotIn("excel.parse", [r["stage"] for r in instrumentation.run_records()])
+
+    def test_read_sheet_stream_matches_pandas(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Data"
+        ws.append(["Material", None, "Mnozstvi", "Material", "Datum"])
+        ws.append(["00123", "x", 2.0, "M1", None])
+        ws.append([456, None, 2.5, None, "NA"])
+        ws.append([None, None, None, None, None, "navíc"])
+        ws.append(["M4", "y", 7, "M2", "#N/A"])
+        ws.append([None, None, None])
+        wb.save(self.output_file)
+
+        for kwargs in ({}, {"dtype": str}, {"usecols": [0, 2]}, {"usecols": ["Material.1", "Mnozstvi"]},
+                       {"usecols": lambda c: c.startswith("Unnamed")}, {"nrows": 2, "dtype": str}):
+            expected = pd.read_excel(self.output_file, sheet_name="Data", **kwargs)
+            pd.testing.assert_frame_equal(read_sheet_stream(self.output_file, "Data", **kwargs), expected)
+
+    def test_write_excel_tables(self):
+        df = pd.DataFrame({"Material": ["M1", "M2"], "Batch": ["B1", None], "Mnozstvi": [1.5, 2]})
+        write_excel_tables(self.output_file, [("SAP", df, "tbl_SAP"), ("RABEN", df.iloc[:0], "tbl_RABEN")])
+
+        wb = openpyxl.load_workbook(self.output_file)
+        ws = wb["SAP"]
+        self.assertEqual(ws.tables["tbl_SAP"].ref, "A1:C3")
+        self.assertIsNone(ws["B3"].value, "NaN se má zapsat jako prázdná buňka.")
+        self.assertEqual(ws["C2"].value, 1.5)
+        self.assertEqual(len(wb["RABEN"].tables), 0, "Prázdný list nemá mít tabulku.")
+
+    def test_parse_quantity_report(self):
+        raw = pd.Series(["1 500,50", "1.500,50", "1\xa0500,5", "3,00", "nan", "", None, "chyba"], dtype=object)
+        values, invalid = parse_quantity_report(raw)
+
+        self.assertListEqual(list(values), [1500.5, 1500.5, 1500.5, 3.0, 0.0, 0.0, 0.0, 0.0])
+        self.assertListEqual(list(invalid.index), [7], "Nepřevoditelná hodnota se má nahlásit s indexem řádku.")
+
+    def test_text_values(self):
+        # Číselná šarže s prázdnou buňkou (float64) -> text bez ".0", prázdná zůstává NaN (ne "nan")
+        values = text_values(pd.Series([123.0, None, 7.5]))
+        self.assertListEqual(list(values[values.notna()]), ["123", "7.5"])
+        self.assertTrue(pd.isna(values[1]))
+        batch = compact_text(pd.DataFrame({"Batch": [123, None, 123]}), ["Batch"])["Batch"]
+        self.assertListEqual(list(batch.cat.categories), ["123"])
+        self.assertEqual(int(batch.isna().sum()), 1)
+
+    def tearDown(self):
+        for path in (self.input_file, self.output_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+if __name__ == "__main__":
+    unittest.main()
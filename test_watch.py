@@ -0,0 +1,53 @@
+import unittest
+import pandas as pd
+import os
+import shutil
+from watch import watch, find_inputs, is_complete
+from pipeline import RESULT_FILE
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = "test_watch_temp"
+        self.input_dir = os.path.join(self.work_dir, "in")
+        self.output_dir = os.path.join(self.work_dir, "out")
+        os.makedirs(self.input_dir)
+
+        pd.DataFrame({
+            "Material": ["M1", "M2", "TOP"],
+            "Material description": ["A", "B", "Top"],
+            "Batch": ["B1", "B2", "T1"],
+            "Total Quantity": [10, 5, 1000],
+            "Storage location": ["F010", "F070", "F010"],
+        }).to_excel(os.path.join(self.input_dir, "SAP.xlsx"), index=False)
+
+    def test_watch_processes_completed_inputs(self):
+        # Bez RABEN se nic nespouští
+        self.assertIsNone(find_inputs(self.input_dir))
+
+        raben_path = os.path.join(self.input_dir, "RABEN.xlsx")
+        with open(raben_path, "wb") as f:
+            f.write(b"PK\x03\x04 napul nahrany soubor")
+        self.assertFalse(is_complete(raben_path))
+
+        pd.DataFrame({
+            "1-Císlo zboží": ["M1", "M2"],
+            "3-název": ["A", "B"],
+            "4-ks": ["10,00", "2,00"],
+            "12-šarže": ["B1", "B2"],
+        }).to_excel(raben_path, index=False)
+        self.assertTrue(is_complete(raben_path))
+
+        watch(self.input_dir, self.output_dir, interval=0.05, debounce=0.1, max_runs=1)
+
+        df = pd.read_excel(os.path.join(self.output_dir, RESULT_FILE), sheet_name="Vysledky")
+        self.assertEqual(len(df), 2)
+        # Atomický zápis nenechává dočasné soubory
+        self.assertFalse([n for n in os.listdir(self.output_dir) if n.endswith(".tmp")])
+
+    def tearDown(self):
+        if os.path.exists(self.work_dir):
+            shutil.rmtree(self.work_dir)
+
+if __name__ == '__main__':
+    unittest.main()
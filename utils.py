@@ -1,78 +1,566 @@
 import pandas as pd
+import numpy as np
 import openpyxl
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.worksheet.table import Table, TableStyleInfo, TableColumn
+from openpyxl.worksheet.filters import AutoFilter
 from openpyxl.utils import get_column_letter
+from openpyxl.styles import Font
+from openpyxl.cell import WriteOnlyCell
+from pandas.io.parsers import TextParser
+import importlib.util
 import os
+import warnings
+import excel_cache
+from instrumentation import get_logger, stage
 
-def find_best_sheet(file_path):
+log = get_logger("utils")
+
+# Kolik řádků nejvýše projdeme, když list nemá použitelnou značku <dimension>
+SCAN_ROW_LIMIT = 1000
+# Kolik prvních řádků listu projde sonda hlavičky (exporty SAP mívají nad hlavičkou titulek)
+HEADER_PROBE_ROWS = 30
+
+# Čtení listů: "stream" = read_sheet_stream (openpyxl read_only, jen hodnoty potřebných sloupců),
+# "pandas" = pd.read_excel. Obě cesty vrací stejný DataFrame; SKLADY_EXCEL_READER=pandas vrátí původní cestu.
+EXCEL_READERS = ("stream", "pandas")
+EXCEL_READER = os.environ.get("SKLADY_EXCEL_READER", "stream")
+
+# Limit řádků jednoho listu Excelu (včetně hlavičky)
+EXCEL_MAX_ROWS = 1_048_576
+# Formáty datových souborů mimo Excel; parquet a feather potřebují pyarrow
+DATA_FORMATS = ("parquet", "csv", "feather")
+
+# Množství se po načtení drží jako celé číslo v jednotkách 10^-QUANTITY_DECIMALS (int64),
+# součty a porovnání (Rozdil == 0) jsou tak přesné; na desetinná čísla se převádí až při zápisu
+QUANTITY_DECIMALS = int(os.environ.get("SKLADY_QUANTITY_DECIMALS", "3"))
+QUANTITY_SCALE = 10 ** QUANTITY_DECIMALS
+
+def _scan_sheet_size(ws):
     """
-    Najde list s největší datovou plochou (počet řádků * počet sloupců).
-    Sdílená funkce pro autodetekci listu.
+    Záložní odhad velikosti listu: projde nejvýše SCAN_ROW_LIMIT řádků
+    a vrátí (poslední neprázdný řádek, poslední neprázdný sloupec).
+    """
+    ws.reset_dimensions()
+    last_row = 0
+    last_col = 0
+    for row_idx, row in enumerate(ws.iter_rows(max_row=SCAN_ROW_LIMIT, values_only=True), start=1):
+        filled = [i for i, v in enumerate(row, start=1) if v is not None and v != ""]
+        if filled:
+            last_row = row_idx
+            last_col = max(last_col, filled[-1])
+    return last_row, last_col
+
+def _sheet_area(ws):
+    """
+    Datová plocha listu (datové řádky bez hlavičky * počet sloupců).
+    Bere se z metadat read_only listu, bez parsování buněk.
+    """
+    max_row, max_col = ws.max_row, ws.max_column
+    # Chybějící nebo zjevně špatná dimenze (typicky "A1:A1" u exportů z jiných nástrojů)
+    if not max_row or not max_col or (max_row <= 1 and max_col <= 1):
+        max_row, max_col = _scan_sheet_size(ws)
+    return max(max_row - 1, 0) * max_col
+
+def _header_text(row):
+    return ["" if value is None else str(value) for value in row]
+
+def probe_header(ws, columns):
+    """
+    Sonda hlavičky: projde jen prvních HEADER_PROBE_ROWS řádků listu a najde řádek,
+    ve kterém je nejvíc hledaných sloupců (bez mezer a velikosti písmen, viz resolve_usecols).
+    Vrací (index řádku hlavičky od 0, hlavička jako texty, počet nalezených sloupců).
+    """
+    wanted = {str(c).strip().lower() for c in columns}
+    best = (0, [], 0)
+    for idx, row in enumerate(ws.iter_rows(max_row=HEADER_PROBE_ROWS, values_only=True)):
+        header = _header_text(row)
+        matched = len(wanted & {name.strip().lower() for name in header})
+        if matched > best[2]:
+            best = (idx, header, matched)
+            if matched == len(wanted):
+                break
+    return best
+
+def detect_sheet(file_path, columns=None, required=None):
+    """
+    Najde list s daty. Bez columns: list s největší datovou plochou (počet řádků * počet sloupců),
+    plocha se určuje z metadat (openpyxl read_only), žádný list se neparsuje celý.
+    S columns: v listech (od největšího) proběhne sonda hlavičky (probe_header) a vyhraje list
+    s nejvíc nalezenými sloupci, při shodě větší plocha; hlavička nemusí být na prvním řádku.
+    required: sloupce, bez kterých nemá smysl list načítat - chybí-li, ValueError hned po sondě.
+    Vrací (název listu, plocha, hlavička jako texty, index řádku hlavičky od 0).
     """
     try:
-        xl = pd.ExcelFile(file_path)
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
     except Exception as e:
         raise ValueError(f"Nelze otevřít Excel soubor: {e}")
 
     best_sheet = None
-    max_area = -1
-    
-    for sheet_name in xl.sheet_names:
-        # Pandas read_excel je nákladné, pro optimalizaci by šlo použít openpyxl read_only,
-        # ale pro běžné velikosti souborů je toto OK a robustní.
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
-        area = df.shape[0] * df.shape[1]
-        
-        if area > max_area and not df.empty:
-            max_area = area
-            best_sheet = sheet_name
-            
+    max_area = 0
+    header = []
+    header_row = 0
+
+    try:
+        areas = [(ws.title, _sheet_area(ws)) for ws in wb.worksheets]
+        candidates = sorted([item for item in areas if item[1] > 0], key=lambda item: -item[1])
+        if candidates:
+            best_sheet, max_area = candidates[0]
+
+        if columns is not None:
+            wanted = len({str(c).strip().lower() for c in columns})
+            best_matched = 0
+            for title, area in candidates:
+                row_idx, row_header, matched = probe_header(wb[title], columns)
+                if matched > best_matched:
+                    best_sheet, max_area, header, header_row, best_matched = title, area, row_header, row_idx, matched
+                    # Všechny sloupce nalezeny - menší listy už vyhrát nemůžou
+                    if matched == wanted:
+                        break
+        if best_sheet is not None and not header:
+            # Hlavička ze stejně otevřeného sešitu (druhé otevření = znovu číst sdílené texty)
+            header = _header_text(next(wb[best_sheet].iter_rows(max_row=1, values_only=True), ()))
+    finally:
+        wb.close()
+
     if best_sheet is None:
         raise ValueError("Nenašel jsem žádný list s daty.")
-        
-    print(f"   -> Vybrán list: '{best_sheet}' (Plocha: {max_area} buněk)")
-    return best_sheet
 
-def create_excel_table(file_path, sheet_name, table_name):
+    if required:
+        found = {name.strip().lower() for name in header}
+        missing = [str(c) for c in required if str(c).strip().lower() not in found]
+        if missing:
+            raise ValueError(f"Soubor {os.path.basename(file_path)}, list '{best_sheet}': "
+                             f"chybí povinné sloupce: {', '.join(missing)}")
+
+    log.info(f"   -> Vybrán list: '{best_sheet}' (Plocha: {max_area} buněk)")
+    if header_row:
+        log.info(f"   -> Hlavička na řádku {header_row + 1}")
+    return best_sheet, max_area, header, header_row
+
+def find_best_sheet(file_path):
     """
-    Otevře existující Excel, na daném listu vytvoří formátovanou tabulku (ListObject)
-    přes celou oblast dat a soubor uloží.
+    Název listu s největší datovou plochou (viz detect_sheet).
+    Sdílená funkce pro autodetekci listu.
     """
-    try:
-        wb = openpyxl.load_workbook(file_path)
-        if sheet_name not in wb.sheetnames:
-            print(f"⚠️ Varování: List '{sheet_name}' v souboru neexistuje, tabulka nevytvořena.")
-            return
+    return detect_sheet(file_path)[0]
 
+def resolve_usecols(header, columns):
+    """
+    Pozice hledaných sloupců v hlavičce (porovnání bez mezer a velikosti písmen).
+    U duplicitních názvů bere první výskyt, stejně jako pandas drží původní název jen u prvního.
+    """
+    wanted = {str(c).strip().lower() for c in columns}
+    found = set()
+    positions = []
+    for i, name in enumerate(header):
+        key = name.strip().lower()
+        if key in wanted and key not in found:
+            found.add(key)
+            positions.append(i)
+    return positions
+
+def _excel_value(value):
+    """
+    Hodnota buňky stejně jako ji vidí pd.read_excel: prázdná -> "", chyba (#N/A, #DIV/0! ...) -> NaN,
+    celé číslo uložené jako float -> int.
+    """
+    if value is None:
+        return ""
+    if type(value) is float and value.is_integer():
+        return int(value)
+    if type(value) is str and value in ERROR_CODES:
+        return np.nan
+    return value
+
+def _header_names(values):
+    """
+    Názvy sloupců jako v pandas: prázdné -> "Unnamed: i", duplicity -> "název.1", "název.2" ...
+    """
+    names = []
+    seen = {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value == "" else value
+        base = name
+        while name in seen:
+            seen[base] += 1
+            name = f"{base}.{seen[base]}"
+        seen[name] = 0
+        names.append(name)
+    return names
+
+def _stream_positions(header, usecols):
+    """
+    Pozice sloupců pro usecols: seznam pozic, seznam názvů, nebo funkce volaná na název sloupce.
+    """
+    names = _header_names(header)
+    if callable(usecols):
+        return [i for i, name in enumerate(names) if usecols(name)]
+    positions = set()
+    for col in usecols:
+        if isinstance(col, int):
+            if not 0 <= col < len(names):
+                raise ValueError(f"Sloupec na pozici {col} je mimo hlavičku listu.")
+            positions.add(col)
+        elif col in names:
+            positions.add(names.index(col))
+        else:
+            raise ValueError(f"Sloupec '{col}' v hlavičce listu není.")
+    return sorted(positions)
+
+def read_sheet_stream(file_path, sheet_name, header=0, usecols=None, nrows=None, dtype=None):
+    """
+    Proudové čtení listu přes openpyxl read_only (iter_rows(values_only=True)).
+    Oproti pd.read_excel nevznikají objekty buněk a z každého řádku se drží jen vybrané
+    sloupce (usecols), takže paměť i čas závisí na počtu použitých sloupců.
+    nrows omezí počet datových řádků (čtení se pak zastaví dřív).
+    Typy sloupců odvozuje stejný TextParser jako pd.read_excel, výsledek je tedy shodný.
+    Rozdíl: text v buňce přesně rovný chybovému kódu Excelu (#DIV/0! ...) se čte jako NaN.
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
         ws = wb[sheet_name]
-        max_row = ws.max_row
-        max_col = ws.max_column
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+
+        for _ in range(header or 0):
+            if next(rows, None) is None:
+                return pd.DataFrame()
+
+        header_row = None
+        if header is not None:
+            first = next(rows, None)
+            if first is None:
+                return pd.DataFrame()
+            header_row = [_excel_value(v) for v in first]
+            while header_row and header_row[-1] == "":
+                header_row.pop()
+
+        positions = None
+        if usecols is not None and header_row is not None:
+            positions = _stream_positions(header_row, usecols)
+
+        data = []
+        width = 0 if header_row is None else len(header_row)
+        last_with_data = -1
+        for row in rows:
+            n = len(row)
+            if positions is None:
+                values = [_excel_value(v) for v in row]
+                while values and values[-1] == "":
+                    values.pop()
+                width = max(width, len(values))
+            else:
+                if n > width and callable(usecols):
+                    # Řádek širší než hlavička: sloupce "Unnamed: i" posoudí funkce usecols
+                    used = n - next((k for k, v in enumerate(reversed(row)) if v is not None and v != ""), n)
+                    positions += [i for i in range(width, used) if usecols(f"Unnamed: {i}")]
+                    width = max(width, used)
+                values = [_excel_value(row[p]) if p < n else "" for p in positions]
+
+            # Prázdný řádek = prázdný v celé šířce listu, ne jen ve vybraných sloupcích
+            if row.count(None) + row.count("") != n:
+                last_with_data = len(data)
+            data.append(values)
+            if nrows is not None and len(data) >= nrows:
+                break
+    finally:
+        wb.close()
+
+    data = data[:last_with_data + 1]
+    names = None
+    if header_row is not None:
+        all_names = _header_names(header_row + [""] * (width - len(header_row)))
+        names = all_names if positions is None else [all_names[p] for p in positions]
+    if not data and names is None:
+        return pd.DataFrame()
+    if names == []:
+        return pd.DataFrame(columns=[])
+    row_width = len(names) if names is not None else width
+    data = [values + [""] * (row_width - len(values)) if len(values) < row_width else values for values in data]
+    parser = TextParser(data, names=names, header=None, dtype=dtype, skip_blank_lines=False)
+    return parser.read()
+
+def read_excel_sheet(file_path, sheet_name, **read_kwargs):
+    """
+    Načte list podle nastavené čtečky (EXCEL_READER). Jediné místo, kde se volí mezi
+    proudovým čtením a pd.read_excel; read_kwargs: header, usecols, nrows, dtype.
+    """
+    if EXCEL_READER == "stream":
+        return read_sheet_stream(file_path, sheet_name, **read_kwargs)
+    return pd.read_excel(file_path, sheet_name=sheet_name, **read_kwargs)
+
+def load_best_sheet(file_path, use_cache=None, columns=None, required=None, **read_kwargs):
+    """
+    Autodetekce listu + jediné načtení vybraného listu.
+    Vrací dvojici (název listu, DataFrame). read_kwargs se předají čtečce (viz read_excel_sheet).
+    columns: názvy potřebných sloupců - list a řádek hlavičky najde sonda (detect_sheet),
+    načtou se jen tyto sloupce (šířka exportu pak nehraje roli) a řádky nad hlavičkou se přeskočí.
+    required: povinné sloupce; chybí-li, ValueError ještě před načtením listu. Ostatní
+    chybějící sloupce se nehlásí, to je na volajícím.
+    Při nezměněném souboru se výsledek bere z cache (viz excel_cache), bez openpyxl.
+    """
+    def loader():
+        with stage("excel.detect_sheet"):
+            sheet_name, _, header, header_row = detect_sheet(file_path, columns, required)
+        kwargs = dict(read_kwargs)
+        if columns is not None:
+            positions = resolve_usecols(header, columns)
+            if positions:
+                kwargs["usecols"] = positions
+            if header_row:
+                kwargs.setdefault("header", header_row)
+        with stage("excel.parse") as st:
+            df = read_excel_sheet(file_path, sheet_name, **kwargs)
+            st["rows_out"] = len(df)
+        return sheet_name, df
+
+    # Klíč "auto" = list vybraný autodetekcí (výběr je součástí uloženého výsledku)
+    options = dict(read_kwargs)
+    if columns is not None:
+        options["columns"] = sorted(str(c).strip().lower() for c in columns)
+    return excel_cache.cached(file_path, "auto", options, loader, use_cache)
+
+def _cell_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def text_values(series):
+    """
+    Textový sloupec načtený bez dtype=str jako text, stejně jako ho vrátí čtení s dtype=str:
+    čísla -> "123" (i 123.0 z číselného sloupce s prázdnými buňkami), NaN zůstává.
+    Jinak by klíč SAP šarže 123 vyšel "123.0" a nespároval se s RABEN "123".
+    """
+    if pd.api.types.is_string_dtype(series) and not pd.api.types.is_object_dtype(series):
+        return series
+    # Sloupec object + where: astype("str") by na pandas <= 2.2 udělal z NaN text "nan"
+    values = series.astype(object)
+    present = values.notna()
+    return values.where(~present, values[present].map(_cell_text))
+
+def compact_text(df, columns):
+    """
+    Opakující se textové sloupce (Material, Nazev, Batch) jako category:
+    každá hodnota je v paměti jen jednou, řádky drží jen kódy. Hodnoty jsou vždy text (viz text_values).
+    """
+    return df.assign(**{col: text_values(df[col]).astype("category") for col in columns})
+
+# Kolik indexů chybných řádků nejvýše vypíšeme v souhrnném varování
+MAX_REPORTED_ROWS = 20
+
+def parse_quantity_report(series):
+    """
+    Vektorový převod množství na float (pandas string operace, bez apply).
+    Řeší formáty: "1 500,50", "1.500,50", "1500,50" i tvrdé mezery (NBSP).
+    Prázdné hodnoty a 'nan' -> 0.
+    Vrací dvojici (hodnoty, nepřevoditelné původní hodnoty s indexy řádků).
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.fillna(0).astype(float), series.iloc[:0]
+
+    s = series.astype(str).str.strip()
+    empty = series.isna() | (s == '') | (s.str.lower() == 'nan')
+
+    # 1. Odstraníme mezery (běžné i tvrdé/non-breaking)
+    s = s.str.replace(' ', '', regex=False).str.replace('\xa0', '', regex=False)
+
+    # 2. Obsahuje-li řetězec čárku I tečku (např. "1.200,50"), tečka je oddělovač tisíců
+    both = s.str.contains(',', regex=False) & s.str.contains('.', regex=False)
+    s = s.where(~both, s.str.replace('.', '', regex=False))
+
+    # 3. Desetinná čárka -> tečka
+    s = s.str.replace(',', '.', regex=False)
+
+    values = pd.to_numeric(s.where(~empty), errors='coerce')
+    invalid = values.isna() & ~empty
+    return values.fillna(0).astype(float), series[invalid]
+
+def report_invalid_quantities(invalid, label):
+    """
+    Jedno souhrnné varování za celý sloupec místo výpisu pro každou buňku.
+    """
+    if invalid.empty:
+        return
+    rows = [str(i) for i in invalid.index[:MAX_REPORTED_ROWS]]
+    if len(invalid) > MAX_REPORTED_ROWS:
+        rows.append("...")
+    samples = ", ".join(repr(v) for v in invalid.unique()[:5])
+    log.warning(f"⚠️ Varování: {len(invalid)} hodnot ve sloupci '{label}' nelze převést na číslo, nahrazuji 0.")
+    log.warning(f"   -> Řádky (index): {', '.join(rows)}; ukázka hodnot: {samples}")
+
+def parse_quantity(series, label):
+    """
+    parse_quantity_report + souhrnné varování. Vrací sloupec množství v celých jednotkách (viz to_units).
+    """
+    values, invalid = parse_quantity_report(series)
+    report_invalid_quantities(invalid, label)
+    return to_units(values)
+
+def to_units(values):
+    """
+    Desetinná množství -> int64 v jednotkách 10^-QUANTITY_DECIMALS (zaokrouhleno).
+    Chybějící a nečíselné hodnoty -> 0.
+    """
+    numbers = pd.to_numeric(values, errors="coerce").fillna(0).to_numpy(dtype=float)
+    return pd.Series(np.rint(numbers * QUANTITY_SCALE).astype(np.int64), index=values.index, name=values.name)
+
+def from_units(units):
+    """
+    Celé jednotky -> desetinné množství (float) pro zápis a výpisy.
+    """
+    return units / QUANTITY_SCALE
+
+def check_units(df, columns):
+    """
+    Ověří, že sloupce množství (ty z columns, které v df jsou) jsou v celých jednotkách (celočíselný typ).
+    Desetinná množství (float, text) bez převodu přes to_units se odmítnou hned, ne až špatnými součty.
+    """
+    wrong = [col for col in columns if col in df.columns and not pd.api.types.is_integer_dtype(df[col])]
+    if wrong:
+        raise ValueError(f"Množství {', '.join(wrong)} nejsou v celých jednotkách (int64); "
+                         f"desetinná množství předejte s units=False")
+
+def decimal_quantities(df, columns):
+    """
+    Kopie pro zápis: sloupce množství v celých jednotkách (ty z columns, které v df jsou)
+    převedené na desetinná čísla. Podle typu sloupce se nehádá - volající ví, že má jednotky.
+    """
+    return df.assign(**{col: from_units(df[col]) for col in columns if col in df.columns})
+
+def _table_style():
+    # Styl (modrý pruhovaný - standard)
+    return TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False,
+                          showLastColumn=False, showRowStripes=True, showColumnStripes=False)
+
+def _sheet_rows(df):
+    """
+    Generátor řádků pro write_only list: NaN/NA -> prázdná buňka (stejně jako df.to_excel).
+    """
+    values = df.astype(object).where(df.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+def column_widths(df, padding=2):
+    """
+    Šířky sloupců pro autofit (nejdelší text v sloupci včetně hlavičky + padding).
+    Počítá se vektorově z DataFrame ještě před zápisem, bez procházení buněk openpyxl.
+    """
+    widths = []
+    for col in df.columns:
+        values = df[col]
+        max_len = values.astype(str).where(values.notna(), "").str.len().max() if len(df) else 0
+        widths.append(max(int(max_len or 0), len(str(col))) + padding)
+    return widths
+
+def write_excel_tables(file_path, sheets):
+    """
+    Zapíše jeden nebo více DataFrame do Excelu a na každém listu rovnou
+    definuje formátovanou tabulku (ListObject) přes celou oblast dat.
+    sheets: seznam trojic (sheet_name, df, table_name), případně čtveřic
+    s dalším slovníkem voleb formátu:
+      - "widths": šířky sloupců (viz column_widths)
+      - "bold_header": tučná hlavička
+      - "conditional": seznam dvojic (rozsah, pravidlo) podmíněného formátování
+    table_name=None znamená list bez tabulky.
+
+    Řádky se streamují přes openpyxl write_only, takže odpadá druhé
+    otevírání a ukládání sešitu kvůli tabulce nebo formátování.
+    Soubor se zapisuje přes dočasný soubor a přejmenování (nikdy není vidět napůl zapsaný).
+    """
+    wb = openpyxl.Workbook(write_only=True)
+
+    for sheet_name, df, table_name, *extra in sheets:
+        options = extra[0] if extra else {}
+        ws = wb.create_sheet(title=sheet_name)
+
+        # Šířky sloupců musí být nastavené ještě před prvním řádkem
+        for idx, width in enumerate(options.get("widths", []), start=1):
+            ws.column_dimensions[get_column_letter(idx)].width = width
+
+        header = [str(c) for c in df.columns]
+        if options.get("bold_header"):
+            header_font = Font(bold=True)
+            header_cells = []
+            for name in header:
+                cell = WriteOnlyCell(ws, value=name)
+                cell.font = header_font
+                header_cells.append(cell)
+            ws.append(header_cells)
+        else:
+            ws.append(header)
+        for row in _sheet_rows(df):
+            ws.append(row)
+
+        # Podmíněné formátování = pár pravidel na list místo stylu každé buňky
+        for cell_range, rule in options.get("conditional", []):
+            ws.conditional_formatting.add(cell_range, rule)
+
+        if table_name is None:
+            continue
 
         # Pokud je list prázdný nebo má jen hlavičku
-        if max_row < 2:
-            print(f"⚠️ List '{sheet_name}' má málo dat, tabulka nevytvořena.")
-            return
+        if len(df) == 0 or not header:
+            log.warning(f"⚠️ List '{sheet_name}' má málo dat, tabulka nevytvořena.")
+            continue
 
-        # Získáme písmeno posledního sloupce (např. 4 -> D)
-        last_col_letter = get_column_letter(max_col)
-        
         # Definice rozsahu např. "A1:D150"
-        ref = f"A1:{last_col_letter}{max_row}"
-        
-        # Vytvoření tabulky
+        ref = f"A1:{get_column_letter(len(header))}{len(df) + 1}"
         tab = Table(displayName=table_name, ref=ref)
-        
-        # Styl (modrý pruhovaný - standard)
-        style = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False,
-                               showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-        tab.tableStyleInfo = style
-        
-        # Pokud už tabulka se stejným názvem existuje (při přepsání), openpyxl by mohl spadnout
-        # Zde jednoduše přidáme novou. Excel si případně poradí (nebo starou přepíšeme v Python logic předtím)
-        ws.add_table(tab)
-        
-        wb.save(file_path)
-        print(f"   -> Tabulka '{table_name}' vytvořena a uložena.")
-        
-    except Exception as e:
-        print(f"❌ Chyba při formátování tabulky v {file_path}: {e}")
\ No newline at end of file
+        # write_only list nejde zpětně číst, názvy sloupců tabulky proto zadáme sami
+        tab.tableColumns = [TableColumn(id=i, name=name) for i, name in enumerate(header, start=1)]
+        tab.autoFilter = AutoFilter(ref=ref)
+        tab.tableStyleInfo = _table_style()
+        with warnings.catch_warnings():
+            # openpyxl varuje ve write_only režimu vždy, i když sloupce zadané jsou
+            warnings.filterwarnings("ignore", message="In write-only mode")
+            ws.add_table(tab)
+
+    # Atomický zápis: rozepsaný soubor nikdy není vidět pod cílovým názvem
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    log.info(f"   -> Listy {', '.join(sheet[0] for sheet in sheets)} zapsány do: {file_path}")
+
+def shard_frame(df, rows_per_sheet):
+    """
+    Rozdělí DataFrame na části po nejvýše rows_per_sheet řádcích (pohledy, bez kopie dat).
+    Prázdný DataFrame dává jednu prázdnou část, aby se vždy zapsala aspoň hlavička.
+    """
+    if rows_per_sheet < 1:
+        raise ValueError("Počet řádků na list musí být kladný.")
+    return [df.iloc[start:start + rows_per_sheet] for start in range(0, max(len(df), 1), rows_per_sheet)]
+
+def check_data_format(fmt):
+    """
+    Ověří předem (před hodinami zpracování), že pro formát je k dispozici knihovna.
+    """
+    engines = {"parquet": ("pyarrow", "fastparquet"), "feather": ("pyarrow",)}.get(fmt, ())
+    if engines and not any(importlib.util.find_spec(name) for name in engines):
+        raise ImportError(f"Formát {fmt} potřebuje balíček {' nebo '.join(engines)} (pip install pyarrow)")
+
+def write_data_file(df, file_path, fmt):
+    """
+    Zapíše DataFrame do datového souboru (parquet / csv / feather) přes dočasný soubor.
+    CSV je UTF-8 s čárkou a desetinnou tečkou, bez indexu.
+    """
+    if fmt not in DATA_FORMATS:
+        raise ValueError(f"Neznámý formát '{fmt}' (povolené: {', '.join(DATA_FORMATS)})")
+    check_data_format(fmt)
+
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        if fmt == "csv":
+            df.to_csv(tmp_path, index=False, encoding="utf-8")
+        elif fmt == "parquet":
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.reset_index(drop=True).to_feather(tmp_path)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    log.info(f"   -> Data ({len(df)} řádků) zapsána do: {file_path}")
@@ -0,0 +1,143 @@
+import argparse
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import instrumentation
+from instrumentation import get_logger
+from pipeline import INPUT_DIR, OUTPUT_DIR, SAP_FILE, RABEN_FILE, RESULT_FILE, RUN_REPORT_FILE
+from sap_processor import FLAT_FILE_EXTENSIONS
+from delta import SNAPSHOT_FILE
+from history import HISTORY_FILE
+
+log = get_logger("watch")
+
+# --- KONFIGURACE ---
+# Jak často se dívat do vstupní složky (s)
+POLL_INTERVAL = 1.0
+# Jak dlouho se soubory nesmí měnit, než je považujeme za dohrané (s)
+DEBOUNCE = 3.0
+
+def find_inputs(input_dir):
+    """
+    Dvojice (SAP, RABEN) ve vstupní složce, nebo None dokud tam nejsou oba soubory.
+    SAP může být i textový export (SAP.csv / SAP.txt / SAP.tsv).
+    """
+    base = os.path.splitext(SAP_FILE)[0]
+    sap_candidates = [os.path.join(input_dir, SAP_FILE)]
+    sap_candidates += [os.path.join(input_dir, base + ext) for ext in FLAT_FILE_EXTENSIONS]
+    sap = next((p for p in sap_candidates if os.path.exists(p)), None)
+    raben = os.path.join(input_dir, RABEN_FILE)
+    if sap is None or not os.path.exists(raben):
+        return None
+    return sap, raben
+
+def file_signature(path):
+    """
+    Velikost a čas změny - levný otisk souboru bez čtení obsahu.
+    """
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+def is_complete(path):
+    """
+    Xlsx je zip s katalogem na konci; neúplně nahraný soubor zip test neprojde.
+    """
+    if path.lower().endswith(".xlsx"):
+        return zipfile.is_zipfile(path)
+    return True
+
+def _warm_up():
+    """
+    Inicializace worker procesu: import pandas/openpyxl a celého řetězce proběhne jen jednou.
+    """
+    import pipeline  # noqa: F401
+
+def run_job(sap_path, raben_path, output_dir, delta=False):
+    """
+    Jeden běh porovnání ve worker procesu. Vrací krátký souhrn pro log služby.
+    Načtení stran běží sekvenčně: worker je už sám oddělený proces a nový pool
+    pro každý soubor by znovu platil start procesů a importy, které _warm_up ušetřil.
+    """
+    from pipeline import run_pipeline
+
+    instrumentation.start_run(os.path.join(output_dir, RUN_REPORT_FILE))
+    start = time.perf_counter()
+    df = run_pipeline(sap_path, raben_path, output_dir,
+                      snapshot_path=os.path.join(output_dir, os.path.basename(SNAPSHOT_FILE)), delta=delta,
+                      history_path=os.path.join(output_dir, os.path.basename(HISTORY_FILE)), concurrent=False)
+    return {"klicu": len(df), "sekundy": round(time.perf_counter() - start, 2)}
+
+def watch(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, interval=POLL_INTERVAL, debounce=DEBOUNCE,
+          delta=False, max_runs=None):
+    """
+    Rezidentní režim: hlídá vstupní složku (polling) a po každé dohrané změně SAP/RABEN
+    spustí porovnání v trvalém worker procesu se zahřátými importy.
+    Změna se zpracuje až když se soubory debounce sekund nemění a xlsx jsou celé.
+    max_runs: ukončit po tolika bězích (pro testy), jinak běží do Ctrl+C.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=1, initializer=_warm_up)
+    # Zahřátí hned při startu, ne až při prvním souboru
+    pool.submit(time.sleep, 0).result()
+    log.info(f"--- Služba běží (start {time.perf_counter() - start:.1f} s), hlídám: {input_dir} ---")
+
+    pending = None   # (otisk vstupů, čas první změny)
+    done = None      # otisk naposledy zpracovaných vstupů
+    runs = 0
+    try:
+        while max_runs is None or runs < max_runs:
+            inputs = find_inputs(input_dir)
+            try:
+                signature = tuple(file_signature(p) for p in inputs) if inputs else None
+            except FileNotFoundError:
+                # Soubor mezitím zmizel (přejmenování při nahrávání)
+                signature = None
+
+            if signature is None or signature == done:
+                pending = None
+            elif pending is None or pending[0] != signature:
+                pending = (signature, time.monotonic())
+            elif time.monotonic() - pending[1] >= debounce and all(is_complete(p) for p in inputs):
+                log.info(f"Nové vstupy: {', '.join(os.path.basename(p) for p in inputs)}")
+                try:
+                    result = pool.submit(run_job, *inputs, output_dir, delta).result()
+                    log.info(f"✅ Report {os.path.join(output_dir, RESULT_FILE)}: "
+                             f"{result['klicu']} klíčů, zpracování {result['sekundy']} s")
+                except BrokenProcessPool as e:
+                    log.error(f"❌ Worker proces spadl ({e}), startuji nový.")
+                    pool = ProcessPoolExecutor(max_workers=1, initializer=_warm_up)
+                except Exception as e:
+                    log.error(f"❌ Chyba při zpracování: {e}")
+                # I chybné vstupy se označí jako hotové - znovu až po další změně souborů
+                done, pending = signature, None
+                runs += 1
+                continue
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        log.info("Ukončuji službu.")
+    finally:
+        pool.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Služba: hlídá vstupní složku a po nahrání SAP/RABEN spustí porovnání.")
+    parser.add_argument("--input-dir", default=INPUT_DIR, help="Hlídaná složka se SAP.xlsx a RABEN.xlsx")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Složka pro výstupy")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Interval kontroly složky (s)")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE,
+                        help="Jak dlouho se soubory nesmí měnit před zpracováním (s)")
+    parser.add_argument("--delta", action="store_true", help="Přidat list Zmeny proti předchozímu běhu")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_dir):
+        log.error(f"❌ CHYBA: Složka '{args.input_dir}' neexistuje.")
+        sys.exit(1)
+
+    watch(args.input_dir, args.output_dir, args.interval, args.debounce, args.delta)
+
+if __name__ == "__main__":
+    main()